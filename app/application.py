@@ -6,25 +6,118 @@ Media Captioning Tool - Main Application Class
 """
 
 import os
+import multiprocessing
+import queue
+import bisect
+import heapq
+import shutil
+from operator import itemgetter
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox
-import json
+
+import numpy as np
+from PIL import Image
 
 from app.media_viewer import MediaViewer
 from app.project_manager import ProjectManager
-from app.mask_manager import MaskManager
+from app.mask_manager import MaskManager, points_to_array
+from app.mask_export import (read_video_info, export_video_mask, export_image_masks,
+                             mask_export_key, is_export_current, mark_export_current,
+                             init_export_worker, RASTER_WORKERS)
 from app.ui_components import FileListPanel, MaskListPanel, ControlPanel
-from app.tracking import track_points_with_lk_and_kalman
+from app.video_io import clear_gray_frame_cache, set_gray_frame_cache_budget
+
+# Minimum seconds between tracking progress updates sent to the UI
+PROGRESS_INTERVAL = 0.05
+
+# Tracking dialog values used when the project has no saved tracking settings
+TRACKING_DEFAULTS = {
+    'use_shifted_points': True,
+    'shift_value': 5,
+    'use_window1': True,
+    'window1_size': 21,
+    'use_window2': False,
+    'window2_size': 31,
+    'use_window3': False,
+    'window3_size': 41,
+    'filter_method': "consensus",
+    'frame_step': 1,
+    'fast_tracking': False,
+    'frame_cache_mb': 512
+}
+
+def collect_tracked_points(tracked_frames):
+    """
+    Gather (frame_idx, points) tracking results after frame 0 into (frames, block), where block is
+    a float32 (frames, points, 2) array grown in place as frames arrive, so no per-frame list is kept.
+    """
+    frames = []
+    block = None
+    for frame_idx, points in tracked_frames:
+        if frame_idx == 0:  # Skip first frame as we already have it
+            continue
+        
+        # Double the block when it is full (nothing references it yet, so it can be resized in place)
+        if block is None:
+            block = np.empty((64,) + np.shape(points), dtype=np.float32)
+        elif len(frames) == len(block):
+            block.resize((2 * len(block),) + block.shape[1:], refcheck=False)
+        
+        block[len(frames)] = points
+        frames.append(frame_idx)
+    
+    if block is not None:
+        block.resize((len(frames),) + block.shape[1:], refcheck=False)
+    return frames, block
+
+def block_to_keyframes(frames, block):
+    """Turn a (frames, points, 2) block into keyframes that hold row views of it, skipping frames with lost (NaN) points"""
+    valid = ~np.isnan(block).any(axis=(1, 2))
+    if not valid.all():
+        frames = np.asarray(frames)[valid].tolist()
+        block = block[valid]
+    
+    # Rows of a contiguous block, so each keyframe holds a view instead of its own copy
+    block = np.ascontiguousarray(block)
+    return [{'frame': frame_idx, 'points': points} for frame_idx, points in zip(frames, block)]
+
+def tracked_points_to_keyframes(tracked_frames):
+    """Turn (frame_idx, points) tracking results into keyframes, skipping frame 0 and frames with lost points"""
+    frames, block = collect_tracked_points(tracked_frames)
+    if not frames:
+        return []
+    return block_to_keyframes(frames, block)
+
+def split_tracked_keyframes(tracked_frames, point_counts):
+    """Turn tracking results of several concatenated masks into one keyframe list per mask"""
+    frames, block = collect_tracked_points(tracked_frames)
+    if not frames:
+        return [[] for _ in point_counts]
+    
+    # Each mask gets its own contiguous copy of its columns, so the shared block can be freed
+    bounds = np.cumsum([0] + list(point_counts))
+    return [block_to_keyframes(frames, block[:, start:stop]) for start, stop in zip(bounds[:-1], bounds[1:])]
 
 class MediaCaptioningApp:
     def __init__(self, master):
         self.master = master
         self.current_project = None
         self.current_media = None
+        self._caption_after_id = None
+        self._status_after_id = None
+        self._tracking_dialog = None  # Built on first use, then hidden and reshown
+        self._mask_index = {}  # media_id -> {mask_id: mask} lookup for the current project
         
         # Initialize components
         self.project_manager = ProjectManager(self)
         
+        # Create status bar (packed first so the main frame cannot squeeze it out)
+        self.status_label = ttk.Label(self.master, anchor=tk.W, padding="10 0 10 5")
+        self.status_label.pack(side=tk.BOTTOM, fill=tk.X)
+        
         # Create main frame
         self.main_frame = ttk.Frame(self.master)
         self.main_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
@@ -103,37 +196,48 @@ class MediaCaptioningApp:
         self.mask_manager = MaskManager(self, self.media_viewer.canvas)
     
     def update_ui_state(self):
-        """Update UI state based on current project and media"""
-        has_project = self.current_project is not None
-        has_media = self.current_media is not None
+        """Update the whole UI based on current project and media.
         
-        # Update file list
-        if has_project and 'media_path' in self.current_project:
+        This is the slow path; mutators that only change part of the state
+        should call the matching _refresh_* method instead.
+        """
+        self._refresh_file_list()
+        self._refresh_mask_list()
+        self._refresh_masks_overlay()
+        self._refresh_caption()
+        
+        # Update control panel
+        self.control_panel.update_ui()
+    
+    def _refresh_file_list(self):
+        """Update the file list"""
+        if self.current_project is not None and 'media_path' in self.current_project:
             self.file_list_panel.load_files(self.current_project['media_path'])
         else:
             self.file_list_panel.clear()
-        
-        # Update mask list
-        if has_media:
+    
+    def _refresh_mask_list(self):
+        """Update the mask list for the current media"""
+        if self.current_media is not None:
             media_id = self.current_media['id']
             masks = self.current_project.get('masks', {}).get(media_id, [])
             self.mask_list_panel.update_mask_list(masks)
-            
-            # Draw masks for the current media
-            self.mask_manager.draw_all_masks()
         else:
             self.mask_list_panel.clear()
-        
-        # Update caption
-        if has_media:
-            caption = self.current_media.get('caption', '')
-            self.caption_text.delete(1.0, tk.END)
-            self.caption_text.insert(tk.END, caption)
-        else:
-            self.caption_text.delete(1.0, tk.END)
-        
-        # Update control panel
-        self.control_panel.update_ui()
+    
+    def _refresh_masks_overlay(self):
+        """Redraw the masks for the current media"""
+        if self.current_media is not None:
+            self.mask_manager.draw_all_masks()
+    
+    def _refresh_caption(self):
+        """Show the caption of the current media"""
+        self.caption_text.delete(1.0, tk.END)
+        if self.current_media is not None:
+            self.caption_text.insert(tk.END, self.current_media.get('caption', ''))
+        
+        # Tk tracks edits from here on; until then there is nothing to commit
+        self.caption_text.edit_modified(False)
     
     def new_project(self):
         """Create a new project"""
@@ -148,6 +252,8 @@ class MediaCaptioningApp:
             'masks': {}
         }
         self.current_media = None
+        self.rebuild_mask_index()
+        clear_gray_frame_cache()
         self.update_ui_state()
     
     def open_project(self):
@@ -166,6 +272,9 @@ class MediaCaptioningApp:
             messagebox.showerror("Error", "No project is currently open")
             return
         
+        # Don't lose the last keystrokes still waiting on the caption debounce
+        self._commit_caption()
+        
         if 'file_path' in self.current_project:
             self.project_manager.save_project(self.current_project['file_path'])
         else:
@@ -184,6 +293,7 @@ class MediaCaptioningApp:
         )
         
         if file_path:
+            self._commit_caption()
             self.project_manager.save_project(file_path)
     
     def show_export_dialog(self):
@@ -192,10 +302,13 @@ class MediaCaptioningApp:
             messagebox.showerror("Error", "No project is currently open")
             return
         
+        # Make sure the caption being typed is included in the export
+        self._commit_caption()
+        
         # Create dialog window
         dialog = tk.Toplevel(self.master)
         dialog.title("Export Options")
-        dialog.geometry("500x550")
+        dialog.geometry("500x580")
         dialog.transient(self.master)
         dialog.grab_set()
         dialog.resizable(False, False)
@@ -222,26 +335,36 @@ class MediaCaptioningApp:
         blur_amount_var = tk.IntVar(value=export_settings.get('blur_amount', 3))
         mask_intensity_var = tk.IntVar(value=export_settings.get('mask_intensity', 255))
         invert_mask_var = tk.BooleanVar(value=export_settings.get('invert_mask', False))
+        mask_video_mkv_var = tk.BooleanVar(value=export_settings.get('mask_video_mkv', False))
+        
+        # Last state applied to each widget, so toggles only reconfigure widgets that change
+        applied_states = {}
+        
+        def set_state(widget, state):
+            if applied_states.get(widget) != state:
+                widget.config(state=state)
+                applied_states[widget] = state
         
         # Helper function to update UI state
         def update_ui_state():
             # Media export options
-            media_path_entry.config(state=tk.NORMAL if export_media_var.get() else tk.DISABLED)
-            media_path_button.config(state=tk.NORMAL if export_media_var.get() else tk.DISABLED)
+            set_state(media_path_entry, tk.NORMAL if export_media_var.get() else tk.DISABLED)
+            set_state(media_path_button, tk.NORMAL if export_media_var.get() else tk.DISABLED)
             
             # Caption export options
-            captions_path_entry.config(state=tk.NORMAL if export_captions_var.get() and not use_media_folder_var.get() else tk.DISABLED)
-            captions_path_button.config(state=tk.NORMAL if export_captions_var.get() and not use_media_folder_var.get() else tk.DISABLED)
-            use_media_folder_cb.config(state=tk.NORMAL if export_captions_var.get() and export_media_var.get() else tk.DISABLED)
+            set_state(captions_path_entry, tk.NORMAL if export_captions_var.get() and not use_media_folder_var.get() else tk.DISABLED)
+            set_state(captions_path_button, tk.NORMAL if export_captions_var.get() and not use_media_folder_var.get() else tk.DISABLED)
+            set_state(use_media_folder_cb, tk.NORMAL if export_captions_var.get() and export_media_var.get() else tk.DISABLED)
             
             # Mask export options
-            masks_path_entry.config(state=tk.NORMAL if export_masks_var.get() else tk.DISABLED)
-            masks_path_button.config(state=tk.NORMAL if export_masks_var.get() else tk.DISABLED)
-            mask_offset_entry.config(state=tk.NORMAL if export_masks_var.get() else tk.DISABLED)
-            blur_mask_cb.config(state=tk.NORMAL if export_masks_var.get() else tk.DISABLED)
-            blur_amount_entry.config(state=tk.NORMAL if export_masks_var.get() and blur_mask_var.get() else tk.DISABLED)
-            mask_intensity_entry.config(state=tk.NORMAL if export_masks_var.get() else tk.DISABLED)
-            invert_mask_cb.config(state=tk.NORMAL if export_masks_var.get() else tk.DISABLED)
+            set_state(masks_path_entry, tk.NORMAL if export_masks_var.get() else tk.DISABLED)
+            set_state(masks_path_button, tk.NORMAL if export_masks_var.get() else tk.DISABLED)
+            set_state(mask_offset_entry, tk.NORMAL if export_masks_var.get() else tk.DISABLED)
+            set_state(blur_mask_cb, tk.NORMAL if export_masks_var.get() else tk.DISABLED)
+            set_state(blur_amount_entry, tk.NORMAL if export_masks_var.get() and blur_mask_var.get() else tk.DISABLED)
+            set_state(mask_intensity_entry, tk.NORMAL if export_masks_var.get() else tk.DISABLED)
+            set_state(invert_mask_cb, tk.NORMAL if export_masks_var.get() else tk.DISABLED)
+            set_state(mask_video_mkv_cb, tk.NORMAL if export_masks_var.get() else tk.DISABLED)
         
         # Helper function to browse for directory
         def browse_directory(path_var):
@@ -313,6 +436,9 @@ class MediaCaptioningApp:
         invert_mask_cb = ttk.Checkbutton(masks_frame, text="Invert Mask", variable=invert_mask_var)
         invert_mask_cb.grid(row=6, column=0, sticky=tk.W, pady=2)
         
+        mask_video_mkv_cb = ttk.Checkbutton(masks_frame, text="Save Mask Videos as FFV1 (.mkv)", variable=mask_video_mkv_var)
+        mask_video_mkv_cb.grid(row=7, column=0, columnspan=3, sticky=tk.W, pady=2)
+        
         # Buttons
         button_frame = ttk.Frame(main_frame)
         button_frame.pack(fill=tk.X, pady=(10, 0))
@@ -338,7 +464,8 @@ class MediaCaptioningApp:
                 'blur_mask': blur_mask_var.get(),
                 'blur_amount': blur_amount_var.get(),
                 'mask_intensity': mask_intensity_var.get(),
-                'invert_mask': invert_mask_var.get()
+                'invert_mask': invert_mask_var.get(),
+                'mask_video_mkv': mask_video_mkv_var.get()
             })
             
             # Prepare export paths
@@ -373,7 +500,8 @@ class MediaCaptioningApp:
                         blur_mask_var.get(),
                         blur_amount_var.get(),
                         mask_intensity_var.get(),
-                        invert_mask_var.get()
+                        invert_mask_var.get(),
+                        '.mkv' if mask_video_mkv_var.get() else '.mp4'
                     )
                 
                 messagebox.showinfo("Success", "Export completed successfully!")
@@ -394,195 +522,267 @@ class MediaCaptioningApp:
     
     def export_media(self, export_path):
         """Export media files"""
-        import shutil
         
-        # Copy all media files referenced in the project
-        for media_id in self.current_project.get('media_files', {}):
-            source_path = os.path.join(self.current_project['media_path'], media_id)
-            dest_path = os.path.join(export_path, media_id)
+        def copy_contents(source_path, dest_path):
+            # copy_file_range clones the data on copy-on-write filesystems (Btrfs, XFS) and copies
+            # in the kernel otherwise; copyfile covers other platforms and filesystems it rejects
+            if hasattr(os, 'copy_file_range'):
+                try:
+                    with open(source_path, 'rb') as src, open(dest_path, 'wb') as dst:
+                        remaining = os.fstat(src.fileno()).st_size
+                        while remaining > 0:
+                            copied = os.copy_file_range(src.fileno(), dst.fileno(), remaining)
+                            if copied == 0:
+                                break
+                            remaining -= copied
+                    if remaining == 0:
+                        return
+                except OSError:
+                    pass
+            
+            shutil.copyfile(source_path, dest_path)
+        
+        def copy_media(source_path, dest_path):
+            # Files copied by a previous export keep size and mtime, so skip them (and never copy a file onto itself)
+            if os.path.exists(dest_path):
+                if os.path.samefile(source_path, dest_path):
+                    return
+                source_stat = os.stat(source_path)
+                dest_stat = os.stat(dest_path)
+                if source_stat.st_size == dest_stat.st_size and source_stat.st_mtime == dest_stat.st_mtime:
+                    return
+            
+            # copystat keeps timestamps like copy2
+            copy_contents(source_path, dest_path)
+            shutil.copystat(source_path, dest_path)
+        
+        # Copy all media files referenced in the project, a few at a time since copies are I/O bound
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            futures = []
+            for media_id in self.current_project.get('media_files', {}):
+                source_path = os.path.join(self.current_project['media_path'], media_id)
+                dest_path = os.path.join(export_path, media_id)
+                
+                if os.path.exists(source_path):
+                    futures.append(executor.submit(copy_media, source_path, dest_path))
             
-            if os.path.exists(source_path):
-                shutil.copy2(source_path, dest_path)
+            # Re-raise any copy error
+            for future in futures:
+                future.result()
     
     def export_captions(self, export_path):
         """Export captions to text files"""
-        # Export captions as text files
-        for media_id, media_info in self.current_project.get('media_files', {}).items():
-            caption = media_info.get('caption', '')
-            if caption:
-                caption_filename = f"{os.path.splitext(media_id)[0]}.txt"
-                caption_path = os.path.join(export_path, caption_filename)
-                
-                with open(caption_path, 'w', encoding='utf-8') as f:
-                    f.write(caption)
+        
+        def write_caption(caption_path, data):
+            # Captions unchanged since a previous export are skipped (the size check avoids most reads)
+            try:
+                if os.path.getsize(caption_path) == len(data):
+                    with open(caption_path, 'rb') as f:
+                        if f.read() == data:
+                            return
+            except OSError:
+                pass
+            
+            # Write the encoded bytes unbuffered: one write call per caption
+            with open(caption_path, 'wb', buffering=0) as f:
+                f.write(data)
+        
+        # Export captions as text files, a few at a time since writes are I/O bound
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            futures = []
+            for media_id, media_info in self.current_project.get('media_files', {}).items():
+                caption = media_info.get('caption', '')
+                if caption:
+                    caption_filename = f"{os.path.splitext(media_id)[0]}.txt"
+                    caption_path = os.path.join(export_path, caption_filename)
+                    # Translate newlines like a text-mode write would (\r\n on Windows)
+                    data = caption.replace('\n', os.linesep).encode('utf-8')
+                    futures.append(executor.submit(write_caption, caption_path, data))
+            
+            # Re-raise any write error
+            for future in futures:
+                future.result()
     
     def export_masks_advanced(self, export_path, mask_offset=0, blur_mask=False, blur_amount=3, 
-                             mask_intensity=255, invert_mask=False):
-        """Export masks with advanced options"""
-        import cv2
-        import numpy as np
-        from PIL import Image, ImageDraw, ImageFilter
+                             mask_intensity=255, invert_mask=False, video_ext='.mp4'):
+        """Export masks with advanced options; mask videos are written as H.264 .mp4 or FFV1 .mkv (video_ext)"""
+        
+        options = {
+            'mask_offset': mask_offset,
+            'blur_mask': blur_mask,
+            'blur_amount': blur_amount,
+            'mask_intensity': mask_intensity,
+            'invert_mask': invert_mask
+        }
         
-        # Process each media file that has masks
+        # Precompute the polygons of every media file so workers don't need any application state
+        tasks = []
+        images_by_size = {}
+        image_keys = {}
+        media_dir = self.current_project['media_path']
         for media_id, masks in self.current_project.get('masks', {}).items():
             if not masks:  # Skip if no masks for this media
                 continue
                 
             # Get the original media file path
-            media_path = os.path.join(self.current_project['media_path'], media_id)
+            media_path = os.path.join(media_dir, media_id)
             if not os.path.exists(media_path):
                 messagebox.showwarning("Warning", f"Media file not found: {media_id}")
                 continue
             
             # Determine if it's an image or video
-            is_video = media_id.lower().endswith(('.mp4', '.avi', '.mov'))
+            base, ext = os.path.splitext(media_id)
+            is_video = ext.lower() in ('.mp4', '.avi', '.mov', '.mkv')
             
             if is_video:
-                # Process video
-                cap = cv2.VideoCapture(media_path)
-                if not cap.isOpened():
+                # Mask frames are rasterized from keyframes, so only the metadata is needed
+                video_info = read_video_info(media_path)
+                if video_info is None:
                     messagebox.showwarning("Warning", f"Could not open video: {media_id}")
                     continue
                 
-                # Get video properties
-                width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
-                height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
-                fps = cap.get(cv2.CAP_PROP_FPS)
-                total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-                
-                # Create output video writer
-                mask_path = os.path.join(export_path, f"{os.path.splitext(media_id)[0]}_mask.mp4")
-                fourcc = cv2.VideoWriter_fourcc(*'mp4v')
-                out = cv2.VideoWriter(mask_path, fourcc, fps, (width, height), False)
-                
-                # Create progress dialog
-                progress_window = tk.Toplevel(self.master)
-                progress_window.title("Exporting Video Masks")
-                progress_window.geometry("300x100")
-                progress_window.transient(self.master)
-                progress_window.grab_set()
-                
-                progress_label = ttk.Label(progress_window, text=f"Processing {media_id}...")
-                progress_label.pack(pady=10)
-                
-                progress_var = tk.DoubleVar()
-                progress_bar = ttk.Progressbar(progress_window, variable=progress_var, maximum=100)
-                progress_bar.pack(fill=tk.X, padx=20, pady=10)
-                
-                # Center the progress window
-                self.center_window(progress_window)
+                width, height, fps, total_frames = video_info
+                if total_frames <= 0:
+                    messagebox.showwarning("Warning", f"Could not read frames from video: {media_id}")
+                    continue
                 
-                # Update UI
-                self.master.update()
+                # Interpolate every mask for all frames up front
+                mask_frames = []
+                for mask in masks:
+                    frames_points = self.mask_manager.precompute_interpolated(mask, total_frames)
+                    if frames_points.shape[1] >= 3:
+                        mask_frames.append(frames_points)
                 
-                try:
-                    # Process each frame
-                    frame_idx = 0
-                    while True:
-                        ret, frame = cap.read()
-                        if not ret:
-                            break
-                        
-                        # Create mask frame
-                        mask_frame = np.zeros((height, width), dtype=np.uint8)
-                        
-                        # Draw all masks for this frame
-                        for mask in masks:
-                            points = self.mask_manager.get_interpolated_points(mask, frame_idx)
-                            if points and len(points) >= 3:
-                                # Apply offset to points if needed
-                                if mask_offset != 0:
-                                    points = self._offset_polygon(points, mask_offset)
-                                
-                                # Convert points to numpy array
-                                points = np.array(points, dtype=np.int32)
-                                # Fill the polygon with white (or specified intensity)
-                                cv2.fillPoly(mask_frame, [points], mask_intensity)
-                        
-                        # Apply blur if requested
-                        if blur_mask and blur_amount > 0:
-                            mask_frame = cv2.GaussianBlur(mask_frame, (blur_amount*2+1, blur_amount*2+1), 0)
-                        
-                        # Invert mask if requested
-                        if invert_mask:
-                            mask_frame = cv2.bitwise_not(mask_frame)
-                        
-                        # Write the mask frame
-                        out.write(mask_frame)
-                        frame_idx += 1
-                        
-                        # Update progress
-                        progress_var.set((frame_idx / total_frames) * 100)
-                        progress_window.update()
-                    
-                    # Release video resources
-                    cap.release()
-                    out.release()
-                    
-                finally:
-                    # Close progress window
-                    progress_window.destroy()
+                # Skip masks whose inputs haven't changed since they were last exported
+                mask_path = os.path.join(export_path, f"{base}_mask{video_ext}")
+                key = mask_export_key(mask_frames, (width, height), options, fps, total_frames)
+                if is_export_current(mask_path, key):
+                    continue
                 
+                tasks.append((export_video_mask, (mask_path, mask_frames, total_frames, fps, (width, height)), 1,
+                              [(mask_path, key)]))
             else:
-                # Process image
                 # Open the image to get dimensions
-                img = Image.open(media_path)
-                width, height = img.size
+                with Image.open(media_path) as img:
+                    size = img.size
                 
-                # Create a new black image
-                mask_img = Image.new('L', (width, height), 0)
-                draw = ImageDraw.Draw(mask_img)
-                
-                # Draw all masks
+                # Images only have the keyframe at frame 0
+                polys = []
                 for mask in masks:
-                    points = mask.get('points', [])
+                    points = self.mask_manager.get_interpolated_points(mask, 0)
                     if points and len(points) >= 3:
-                        # Apply offset to points if needed
-                        if mask_offset != 0:
-                            points = self._offset_polygon(points, mask_offset)
-                        
-                        # Convert points to flat list for PIL
-                        flat_points = [coord for point in points for coord in point]
-                        # Fill the polygon with white (or specified intensity)
-                        draw.polygon(flat_points, fill=mask_intensity)
-                
-                # Apply blur if requested
-                if blur_mask and blur_amount > 0:
-                    mask_img = mask_img.filter(ImageFilter.GaussianBlur(radius=blur_amount))
+                        polys.append(points)
                 
-                # Invert mask if requested
-                if invert_mask:
-                    mask_img = ImageOps.invert(mask_img)
+                # Skip masks whose inputs haven't changed since they were last exported
+                mask_path = os.path.join(export_path, f"{base}_mask{ext}")
+                key = mask_export_key(polys, size, options)
+                if is_export_current(mask_path, key):
+                    continue
                 
-                # Save the mask image
-                mask_path = os.path.join(export_path, f"{os.path.splitext(media_id)[0]}_mask{os.path.splitext(media_id)[1]}")
-                mask_img.save(mask_path)
-    
-    def _offset_polygon(self, points, offset):
-        """Offset polygon points by the given amount (positive=expand, negative=shrink)"""
-        if offset == 0 or len(points) < 3:
-            return points
-            
-        import numpy as np
+                image_keys[mask_path] = key
+                images_by_size.setdefault(size, []).append((mask_path, polys))
+        
+        # Batch same-size images so each worker reuses one image buffer, while keeping all workers busy
+        max_workers = os.cpu_count() or 1
+        for size, items in images_by_size.items():
+            batch_size = -(-len(items) // max_workers)
+            for i in range(0, len(items), batch_size):
+                batch = items[i:i + batch_size]
+                tasks.append((export_image_masks, (batch, size), len(batch),
+                              [(mask_path, image_keys[mask_path]) for mask_path, _ in batch]))
+        
+        if not tasks:
+            return
+        
+        total_files = sum(num_files for _, _, num_files, _ in tasks)
         
-        # Convert to numpy array
-        points_array = np.array(points)
+        # Create progress dialog
+        progress_window = tk.Toplevel(self.master)
+        progress_window.title("Exporting Masks")
+        progress_window.geometry("300x100")
+        progress_window.transient(self.master)
+        progress_window.grab_set()
+        progress_window.protocol("WM_DELETE_WINDOW", lambda: None)
         
-        # Calculate centroid
-        centroid = np.mean(points_array, axis=0)
+        progress_label = ttk.Label(progress_window, text=f"Processing 0 of {total_files} files...")
+        progress_label.pack(pady=10)
+        
+        progress_var = tk.DoubleVar()
+        progress_bar = ttk.Progressbar(progress_window, variable=progress_var, maximum=total_files)
+        progress_bar.pack(fill=tk.X, padx=20, pady=10)
         
-        # Calculate vectors from centroid to each point
-        vectors = points_array - centroid
+        # Center the progress window
+        self.center_window(progress_window)
         
-        # Normalize vectors
-        norms = np.sqrt(np.sum(vectors**2, axis=1))
-        normalized_vectors = vectors / norms[:, np.newaxis]
+        # Update UI
+        self.master.update()
         
-        # Apply offset
-        offset_points = points_array + normalized_vectors * offset
+        # Every media file is independent, so export them in parallel worker processes; the CPUs are
+        # split between them so processes x raster threads stays around the CPU count
+        num_processes = min(len(tasks), max_workers)
+        raster_workers = min(RASTER_WORKERS, max(1, max_workers // num_processes))
+        # Spawn (as on Windows) rather than fork: forking while playback, LK and OpenCV threads run
+        # could copy a lock one of them holds into the child and hang it inside cv2
+        executor = ProcessPoolExecutor(max_workers=num_processes, initializer=init_export_worker,
+                                       initargs=(raster_workers,),
+                                       mp_context=multiprocessing.get_context('spawn'))
+        message_queue = queue.Queue()
+        done_var = tk.BooleanVar(value=False)
+        outcome = {'completed': 0}
+        
+        def poll():
+            # Drain finished tasks and refresh the dialog at most once per poll
+            changed = False
+            try:
+                while True:
+                    future, num_files, keys = message_queue.get_nowait()
+                    error = future.exception() if not future.cancelled() else None
+                    if error is not None:
+                        outcome['error'] = error
+                        done_var.set(True)
+                        return
+                    
+                    # Remember what the new files were rendered from
+                    for mask_path, key in keys:
+                        mark_export_current(mask_path, key)
+                    
+                    outcome['completed'] += num_files
+                    changed = True
+            except queue.Empty:
+                pass
+            
+            if changed:
+                progress_var.set(outcome['completed'])
+                progress_label.config(text=f"Processing {outcome['completed']} of {total_files} files...")
+            
+            if outcome['completed'] >= total_files:
+                done_var.set(True)
+            else:
+                self.master.after(100, poll)
         
-        # Convert back to list of tuples
-        return [(int(x), int(y)) for x, y in offset_points]
+        try:
+            for func, args, num_files, keys in tasks:
+                future = executor.submit(func, *args, **options)
+                future.add_done_callback(lambda f, n=num_files, k=keys: message_queue.put((f, n, k)))
+            
+            self.master.after(100, poll)
+            
+            # Process events until every worker reports back
+            progress_window.wait_variable(done_var)
+            
+            if 'error' in outcome:
+                raise outcome['error']
+            
+            # Every future has reported back, so this only joins the idle workers
+            executor.shutdown(wait=True)
+        except BaseException:
+            # Report a failure right away: drop queued exports instead of blocking the UI until
+            # the running ones finish (their processes exit on their own afterwards)
+            executor.shutdown(wait=False, cancel_futures=True)
+            raise
+        finally:
+            # Close progress window
+            progress_window.destroy()
     
     def set_media_path(self):
         """Set the media path for the current project"""
@@ -593,6 +793,7 @@ class MediaCaptioningApp:
         media_path = filedialog.askdirectory(title="Select Media Directory")
         if media_path:
             self.current_project['media_path'] = media_path
+            self.file_list_panel.invalidate()
             self.update_ui_state()
     
     def select_media(self, media_id):
@@ -607,8 +808,7 @@ class MediaCaptioningApp:
                 self.mask_list_panel.set_editing_mode(False)
         
         # Save current caption if there's a current media
-        if self.current_media:
-            self.current_media['caption'] = self.caption_text.get(1.0, tk.END).strip()
+        self._commit_caption()
         
         # Get or create media entry
         if media_id not in self.current_project['media_files']:
@@ -617,16 +817,38 @@ class MediaCaptioningApp:
                 'caption': ''
             }
         
+        # Frames decoded for tracking the previous video are no longer needed
+        if self.current_media is not None and self.current_media['id'] != media_id:
+            clear_gray_frame_cache()
+        
         self.current_media = self.current_project['media_files'][media_id]
         
-        # Update UI
+        # Update UI (load_media already draws the masks, and the file list is unchanged)
         self.media_viewer.load_media(os.path.join(self.current_project['media_path'], media_id))
-        self.update_ui_state()
+        self._refresh_mask_list()
+        self._refresh_caption()
+        self.control_panel.update_ui()
     
     def on_caption_change(self, event=None):
-        """Handle caption text changes"""
-        if self.current_media:
+        """Handle caption text changes (debounced to one commit per 200 ms of typing)"""
+        # Keys that don't edit the text (arrows, modifiers) leave Tk's modified flag unset
+        if not self.caption_text.edit_modified():
+            return
+        
+        if self._caption_after_id:
+            self.master.after_cancel(self._caption_after_id)
+        self._caption_after_id = self.master.after(200, self._commit_caption)
+    
+    def _commit_caption(self):
+        """Write the caption text to the current media, cancelling any pending debounced commit"""
+        if self._caption_after_id:
+            self.master.after_cancel(self._caption_after_id)
+            self._caption_after_id = None
+        
+        # Only read the text back from Tk when it was edited since the last commit
+        if self.current_media and self.caption_text.edit_modified():
             self.current_media['caption'] = self.caption_text.get(1.0, tk.END).strip()
+            self.caption_text.edit_modified(False)
     
     def activate_create_mask_tool(self):
         """Activate the create mask tool"""
@@ -655,6 +877,23 @@ class MediaCaptioningApp:
         
         self.mask_manager.activate_keyframe_mask_tool(mask)
     
+    def rebuild_mask_index(self):
+        """Rebuild the mask lookup index from the current project"""
+        self._mask_index = {}
+        if not self.current_project:
+            return
+        
+        for media_id, masks in self.current_project.get('masks', {}).items():
+            self._mask_index[media_id] = {mask['id']: mask for mask in masks}
+    
+    def get_mask(self, media_id, mask_id):
+        """Look up a mask by ID, indexing the media's masks on first use"""
+        media_index = self._mask_index.get(media_id)
+        if media_index is None:
+            masks = self.current_project.get('masks', {}).get(media_id, [])
+            media_index = self._mask_index[media_id] = {mask['id']: mask for mask in masks}
+        return media_index.get(mask_id)
+    
     def add_mask(self, points):
         """Add a new mask to the current media"""
         if not self.current_media:
@@ -665,18 +904,25 @@ class MediaCaptioningApp:
         if media_id not in self.current_project.get('masks', {}):
             self.current_project.setdefault('masks', {})[media_id] = []
         
-        mask_id = f"mask_{len(self.current_project['masks'][media_id]) + 1}"
+        # Pick the next free mask ID (IDs of deleted masks may still be taken by later ones)
+        media_index = self._mask_index.setdefault(media_id, {})
+        mask_number = len(self.current_project['masks'][media_id]) + 1
+        while f"mask_{mask_number}" in media_index:
+            mask_number += 1
+        mask_id = f"mask_{mask_number}"
         
         new_mask = {
             'id': mask_id,
             'keyframes': [{
                 'frame': 0,  # First keyframe at frame 0
-                'points': points
+                'points': points_to_array(points)
             }]
         }
         
         self.current_project['masks'][media_id].append(new_mask)
-        self.update_ui_state()
+        media_index[mask_id] = new_mask
+        self._refresh_mask_list()
+        self._refresh_masks_overlay()
         
         return new_mask
     
@@ -687,18 +933,20 @@ class MediaCaptioningApp:
         
         media_id = self.current_media['id']
         
-        for mask in self.current_project['masks'].get(media_id, []):
-            if mask['id'] == mask_id:
-                # Add new keyframe with the current frame number
-                mask['keyframes'].append({
-                    'frame': frame,  # Use the actual current frame number
-                    'points': points
-                })
-                # Sort keyframes by frame number
-                mask['keyframes'].sort(key=lambda k: k['frame'])
-                break
+        mask = self.get_mask(media_id, mask_id)
+        if mask:
+            # Insert the new keyframe after any keyframes at or before its frame number
+            keyframes = mask['keyframes']
+            if keyframes and keyframes[-1]['frame'] > frame:
+                index = bisect.bisect_right([k['frame'] for k in keyframes], frame)
+            else:
+                index = len(keyframes)
+            keyframes.insert(index, {
+                'frame': frame,  # Use the actual current frame number
+                'points': points_to_array(points)
+            })
         
-        self.update_ui_state()
+        self._refresh_masks_overlay()
     
     def delete_mask(self, mask_id):
         """Delete a mask"""
@@ -707,10 +955,17 @@ class MediaCaptioningApp:
         
         media_id = self.current_media['id']
         
-        masks = self.current_project['masks'].get(media_id, [])
-        self.current_project['masks'][media_id] = [m for m in masks if m['id'] != mask_id]
+        mask = self.get_mask(media_id, mask_id)
+        if mask is None:
+            return
+        self._mask_index[media_id].pop(mask_id)
         
-        self.update_ui_state()
+        # Remove the indexed mask object from the list in place instead of rebuilding the list
+        masks = self.current_project['masks'][media_id]
+        del masks[next(i for i, m in enumerate(masks) if m is mask)]
+        
+        self._refresh_mask_list()
+        self._refresh_masks_overlay()
     
     def track_mask(self, mask_id):
         """Track mask vertices across frames and create keyframes"""
@@ -727,11 +982,7 @@ class MediaCaptioningApp:
         media_path = self.media_viewer.media_path
         # Find the mask
         media_id = self.current_media['id']
-        mask = None
-        for m in self.current_project['masks'].get(media_id, []):
-            if m['id'] == mask_id:
-                mask = m
-                break
+        mask = self.get_mask(media_id, mask_id)
         
         if not mask or not mask['keyframes']:
             messagebox.showerror("Error", "No valid mask selected")
@@ -746,13 +997,93 @@ class MediaCaptioningApp:
             return  # User cancelled
         
         # Show progress dialog
+        progress_window, progress_var = self.show_tracking_progress("Tracking mask vertices...")
+        
+        try:
+            # Track points across frames with the configured parameters; the worker also builds the keyframes
+            tracked_keyframes = self.run_tracking_in_background(
+                media_path, initial_points, tracking_config, progress_window, progress_var
+            )
+            
+            # Replace existing keyframes except the first one; tracked keyframes are already
+            # in frame order, so a linear merge keeps the list sorted without a full sort
+            mask['keyframes'] = list(heapq.merge([mask['keyframes'][0]], tracked_keyframes, key=itemgetter('frame')))
+            
+            # Update UI
+            self._refresh_masks_overlay()
+            
+            # Report completion without a modal dialog that would block until dismissed
+            self.set_status(f"Tracking complete: added {len(tracked_keyframes)} keyframes")
+            
+        except Exception as e:
+            messagebox.showerror("Error", f"Tracking failed: {str(e)}")
+        finally:
+            # Close progress window
+            progress_window.destroy()
+    
+    def track_all_masks(self):
+        """Track the vertices of every mask of the current video in a single pass over its frames"""
+        if not self.current_media:
+            messagebox.showerror("Error", "No valid media selected")
+            return
+        
+        # Check if media is a video
+        if not self.media_viewer.is_video:
+            messagebox.showerror("Error", "Tracking only works with videos")
+            return
+        
+        media_path = self.media_viewer.media_path
+        media_id = self.current_media['id']
+        masks = [mask for mask in self.current_project['masks'].get(media_id, []) if mask['keyframes']]
+        
+        if not masks:
+            messagebox.showerror("Error", "No masks to track")
+            return
+        
+        # Concatenate the first keyframe points of all masks so the video is decoded once for all of them
+        masks_points = [points_to_array(mask['keyframes'][0]['points']) for mask in masks]
+        initial_points = np.concatenate(masks_points)
+        
+        # Show tracking configuration dialog
+        tracking_config = self.show_tracking_config_dialog()
+        if not tracking_config:
+            return  # User cancelled
+        
+        # Show progress dialog
+        progress_window, progress_var = self.show_tracking_progress(f"Tracking {len(masks)} masks...")
+        
+        try:
+            # Track all points together, then split the keyframes back per mask
+            masks_keyframes = self.run_tracking_in_background(
+                media_path, initial_points, tracking_config, progress_window, progress_var,
+                point_counts=[len(points) for points in masks_points]
+            )
+            
+            # Replace existing keyframes of each mask except the first one, keeping them in frame order
+            for mask, tracked_keyframes in zip(masks, masks_keyframes):
+                mask['keyframes'] = list(heapq.merge([mask['keyframes'][0]], tracked_keyframes, key=itemgetter('frame')))
+            
+            # Update UI
+            self._refresh_masks_overlay()
+            
+            self.set_status(f"Tracking complete: tracked {len(masks)} masks")
+            
+        except Exception as e:
+            messagebox.showerror("Error", f"Tracking failed: {str(e)}")
+        finally:
+            # Close progress window
+            progress_window.destroy()
+    
+    def show_tracking_progress(self, text):
+        """Show a modal tracking progress window; returns (progress_window, progress_var)"""
         progress_window = tk.Toplevel(self.master)
         progress_window.title("Tracking Progress")
         progress_window.geometry("300x100")
         progress_window.transient(self.master)
         progress_window.grab_set()
+        progress_window.protocol("WM_DELETE_WINDOW", lambda: None)
         
-        progress_label = ttk.Label(progress_window, text="Tracking mask vertices...")
+        progress_label = ttk.Label(progress_window, text=text)
         progress_label.pack(pady=10)
         
         progress_var = tk.DoubleVar()
@@ -765,81 +1096,168 @@ class MediaCaptioningApp:
         # Update UI
         self.master.update()
         
-        try:
-            # Track points across frames with the configured parameters
-            tracked_points = self.track_points_with_config(media_path, initial_points, tracking_config)
-            
-            # Clear existing keyframes except the first one
-            first_keyframe = mask['keyframes'][0]
-            mask['keyframes'] = [first_keyframe]
-            
-            # Add keyframes for each frame
-            for frame_idx, points in enumerate(tracked_points):
-                if frame_idx == 0:  # Skip first frame as we already have it
-                    continue
-                    
-                # Skip frames with None points
-                if None in points:
-                    continue
-                    
-                # Add keyframe
-                mask['keyframes'].append({
-                    'frame': frame_idx,
-                    'points': points
-                })
-                
-                # Update progress
-                progress_var.set((frame_idx / len(tracked_points)) * 100)
-                progress_window.update()
-            
-            # Sort keyframes by frame number
-            mask['keyframes'].sort(key=lambda k: k['frame'])
-            
-            # Update UI
-            self.update_ui_state()
+        return progress_window, progress_var
+    
+    def set_status(self, message, timeout=3000):
+        """Show a message in the status bar and clear it after timeout milliseconds"""
+        if self._status_after_id:
+            self.master.after_cancel(self._status_after_id)
+        
+        self.status_label.config(text=message)
+        self._status_after_id = self.master.after(timeout, self._clear_status)
+    
+    def _clear_status(self):
+        """Clear the status bar message"""
+        self._status_after_id = None
+        self.status_label.config(text="")
+    
+    def run_tracking_in_background(self, video_path, initial_points, config, progress_window, progress_var,
+                                   point_counts=None):
+        """
+        Track in a worker thread while the Tk main loop keeps the progress window alive; returns new keyframes.
+        
+        With point_counts, initial_points holds several masks back to back and one keyframe
+        list is returned per mask.
+        """
+        message_queue = queue.Queue()
+        done_var = tk.BooleanVar(value=False)
+        outcome = {}
+        
+        last_progress = [0.0]
+        
+        def report_progress(frame_idx, total):
+            # Post at most one progress message per interval (and always the last frame) instead of one per frame
+            now = time.monotonic()
+            if now - last_progress[0] >= PROGRESS_INTERVAL or frame_idx >= total:
+                last_progress[0] = now
+                message_queue.put(('progress', frame_idx, total))
+        
+        def worker():
+            try:
+                # Keyframes are built as frames are tracked, so the full trajectory is never held in memory
+                tracked_frames = self.track_points_with_config(
+                    video_path, initial_points, config, progress_callback=report_progress
+                )
+                if point_counts is None:
+                    message_queue.put(('done', tracked_points_to_keyframes(tracked_frames)))
+                else:
+                    message_queue.put(('done', split_tracked_keyframes(tracked_frames, point_counts)))
+            except Exception as e:
+                message_queue.put(('error', e))
+        
+        def poll():
+            # Drain the queue; progress is only touched from the main thread
+            latest_progress = None
+            try:
+                while True:
+                    message = message_queue.get_nowait()
+                    if message[0] == 'progress':
+                        latest_progress = message
+                    else:
+                        outcome[message[0]] = message[1]
+                        done_var.set(True)
+                        return
+            except queue.Empty:
+                pass
             
-            messagebox.showinfo("Tracking Complete", f"Added {len(mask['keyframes']) - 1} keyframes")
+            # Only the newest progress value matters, so set the bar once per poll
+            if latest_progress:
+                _, frame_idx, total = latest_progress
+                if total > 0:
+                    progress_var.set(min(frame_idx / total, 1.0) * 100)
             
-        except Exception as e:
-            messagebox.showerror("Error", f"Tracking failed: {str(e)}")
-        finally:
-            # Close progress window
-            progress_window.destroy()
+            self.master.after(50, poll)
+        
+        threading.Thread(target=worker, daemon=True).start()
+        self.master.after(50, poll)
+        
+        # Process events until the worker reports back
+        progress_window.wait_variable(done_var)
+        
+        if 'error' in outcome:
+            raise outcome['error']
+        return outcome['done']
     
     def show_tracking_config_dialog(self):
         """Show dialog for configuring tracking parameters"""
+        # The widget tree is built once and only hidden between runs
+        if not self._tracking_dialog or not self._tracking_dialog['window'].winfo_exists():
+            self._tracking_dialog = self._build_tracking_config_dialog()
+        
+        tracking_dialog = self._tracking_dialog
+        dialog = tracking_dialog['window']
+        
+        # Reset form fields from saved tracking settings or defaults
+        tracking_settings = self.current_project.get('tracking_settings', {})
+        for key, var in tracking_dialog['vars'].items():
+            var.set(tracking_settings.get(key, TRACKING_DEFAULTS[key]))
+        tracking_dialog['update_ui_state']()
+        
+        tracking_dialog['result'] = {"cancelled": True}
+        tracking_dialog['done_var'].set(False)
+        
+        dialog.deiconify()
+        self.center_window(dialog)
+        dialog.grab_set()
+        
+        # Wait until OK or Cancel hides the dialog again
+        dialog.wait_variable(tracking_dialog['done_var'])
+        
+        result = tracking_dialog['result']
+        return None if result["cancelled"] else result
+    
+    def _build_tracking_config_dialog(self):
+        """Create the hidden tracking configuration dialog; returns its window, variables and callbacks"""
         # Create dialog window
         dialog = tk.Toplevel(self.master)
+        dialog.withdraw()
         dialog.title("Tracking Configuration")
-        dialog.geometry("450x400")
+        dialog.geometry("450x545")
         dialog.transient(self.master)
-        dialog.grab_set()
         dialog.resizable(False, False)
         
         # Create main frame with padding
         main_frame = ttk.Frame(dialog, padding="20 20 20 20")
         main_frame.pack(fill=tk.BOTH, expand=True)
         
-        # Get saved tracking settings or use defaults
-        tracking_settings = self.current_project.get('tracking_settings', {})
-        
-        # Variables for form fields
-        use_shifted_points_var = tk.BooleanVar(value=tracking_settings.get('use_shifted_points', True))
-        shift_value_var = tk.IntVar(value=tracking_settings.get('shift_value', 5))
-        
-        use_window1_var = tk.BooleanVar(value=tracking_settings.get('use_window1', True))
-        window1_size_var = tk.IntVar(value=tracking_settings.get('window1_size', 21))
-        
-        use_window2_var = tk.BooleanVar(value=tracking_settings.get('use_window2', False))
-        window2_size_var = tk.IntVar(value=tracking_settings.get('window2_size', 31))
-        
-        use_window3_var = tk.BooleanVar(value=tracking_settings.get('use_window3', False))
-        window3_size_var = tk.IntVar(value=tracking_settings.get('window3_size', 41))
-        
-        filter_method_var = tk.StringVar(value=tracking_settings.get('filter_method', "consensus"))
-        
-        # Result variable
-        result = {"cancelled": True}
+        # Variables for form fields, filled in each time the dialog is shown
+        use_shifted_points_var = tk.BooleanVar()
+        shift_value_var = tk.IntVar()
+        
+        use_window1_var = tk.BooleanVar()
+        window1_size_var = tk.IntVar()
+        
+        use_window2_var = tk.BooleanVar()
+        window2_size_var = tk.IntVar()
+        
+        use_window3_var = tk.BooleanVar()
+        window3_size_var = tk.IntVar()
+        
+        filter_method_var = tk.StringVar()
+        
+        frame_step_var = tk.IntVar()
+        fast_tracking_var = tk.BooleanVar()
+        frame_cache_mb_var = tk.IntVar()
+        
+        tracking_dialog = {
+            'window': dialog,
+            'vars': {
+                'use_shifted_points': use_shifted_points_var,
+                'shift_value': shift_value_var,
+                'use_window1': use_window1_var,
+                'window1_size': window1_size_var,
+                'use_window2': use_window2_var,
+                'window2_size': window2_size_var,
+                'use_window3': use_window3_var,
+                'window3_size': window3_size_var,
+                'filter_method': filter_method_var,
+                'frame_step': frame_step_var,
+                'fast_tracking': fast_tracking_var,
+                'frame_cache_mb': frame_cache_mb_var
+            },
+            'done_var': tk.BooleanVar(value=False),
+            'result': {"cancelled": True}
+        }
         
         # Helper function to update UI state
         def update_ui_state():
@@ -904,12 +1322,35 @@ class MediaCaptioningApp:
         ttk.Radiobutton(filter_frame, text="Consensus", variable=filter_method_var, 
                        value="consensus").pack(anchor=tk.W, pady=2)
         
+        # Speed section (skipped frames are interpolated from the tracked keyframes)
+        step_frame = ttk.LabelFrame(main_frame, text="Speed", padding="10 10 10 10")
+        step_frame.pack(fill=tk.X, pady=(0, 10))
+        
+        ttk.Label(step_frame, text="Track every N frames:").grid(row=0, column=0, sticky=tk.W, pady=2)
+        frame_step_entry = ttk.Spinbox(step_frame, from_=1, to=10, textvariable=frame_step_var, width=5)
+        frame_step_entry.grid(row=0, column=1, sticky=tk.W, pady=2, padx=(5, 0))
+        
+        fast_tracking_cb = ttk.Checkbutton(step_frame, text="Fast Tracking (half resolution for small masks on large videos)",
+                                           variable=fast_tracking_var)
+        fast_tracking_cb.grid(row=1, column=0, columnspan=2, sticky=tk.W, pady=(5, 0))
+        
+        # Decoded frames kept in memory so tracking the same video again skips decoding (0 disables)
+        ttk.Label(step_frame, text="Frame cache (MB):").grid(row=2, column=0, sticky=tk.W, pady=(5, 2))
+        frame_cache_entry = ttk.Spinbox(step_frame, from_=0, to=16384, increment=128,
+                                        textvariable=frame_cache_mb_var, width=6)
+        frame_cache_entry.grid(row=2, column=1, sticky=tk.W, pady=(5, 2), padx=(5, 0))
+        
         # Buttons
         button_frame = ttk.Frame(main_frame)
         button_frame.pack(fill=tk.X, pady=(10, 0))
         
+        def close():
+            dialog.grab_release()
+            dialog.withdraw()
+            tracking_dialog['done_var'].set(True)
+        
         def on_cancel():
-            dialog.destroy()
+            close()
         
         def on_ok():
             # Validate window sizes are odd numbers
@@ -920,18 +1361,11 @@ class MediaCaptioningApp:
             
             # Save tracking settings
             self.current_project.setdefault('tracking_settings', {}).update({
-                'use_shifted_points': use_shifted_points_var.get(),
-                'shift_value': shift_value_var.get(),
-                'use_window1': use_window1_var.get(),
-                'window1_size': window1_size_var.get(),
-                'use_window2': use_window2_var.get(),
-                'window2_size': window2_size_var.get(),
-                'use_window3': use_window3_var.get(),
-                'window3_size': window3_size_var.get(),
-                'filter_method': filter_method_var.get()
+                key: var.get() for key, var in tracking_dialog['vars'].items()
             })
             
             # Collect configuration
+            result = tracking_dialog['result']
             result["cancelled"] = False
             result["use_shifted_points"] = use_shifted_points_var.get()
             result["shift_value"] = shift_value_var.get()
@@ -945,39 +1379,44 @@ class MediaCaptioningApp:
                 result["windows"].append(window3_size_var.get())
             
             result["filter_method"] = filter_method_var.get()
+            result["frame_step"] = max(1, frame_step_var.get())
+            result["fast_tracking"] = fast_tracking_var.get()
+            result["frame_cache_mb"] = max(0, frame_cache_mb_var.get())
             
-            dialog.destroy()
+            close()
         
         ttk.Button(button_frame, text="Cancel", command=on_cancel).pack(side=tk.RIGHT, padx=(5, 0))
         ttk.Button(button_frame, text="OK", command=on_ok).pack(side=tk.RIGHT)
         
-        # Initialize UI state
-        update_ui_state()
+        # Closing the window hides it like Cancel so the widgets can be reused
+        dialog.protocol("WM_DELETE_WINDOW", on_cancel)
         
-        # Center the dialog on the screen
-        self.center_window(dialog)
-        
-        # Wait for dialog to close
-        dialog.wait_window()
+        tracking_dialog['update_ui_state'] = update_ui_state
         
-        return None if result["cancelled"] else result
+        return tracking_dialog
     
-    def track_points_with_config(self, video_path, initial_points, config):
-        """Track points using the configured parameters"""
-        from app.tracking import track_points_with_consensus
+    def track_points_with_config(self, video_path, initial_points, config, progress_callback=None):
+        """Track points using the configured parameters, yielding (frame_idx, points) per frame"""
+        # Imported here so the tracker (and numba, if installed) only loads when tracking is used
+        from app.tracking import iter_points_cached
+        
+        set_gray_frame_cache_budget(config.get("frame_cache_mb", TRACKING_DEFAULTS['frame_cache_mb']) * 1024 * 1024)
         
         # If no windows specified, use default
         if not config["windows"]:
             config["windows"] = [21]
         
-        # Call the tracking function with the configured parameters
-        return track_points_with_consensus(
+        # Call the tracking function with the configured parameters (identical earlier runs are replayed from disk)
+        return iter_points_cached(
             video_path, 
             initial_points, 
             use_shifted_points=config["use_shifted_points"],
             shift_value=config["shift_value"],
             window_sizes=config["windows"],
-            filter_method=config["filter_method"]
+            filter_method=config["filter_method"],
+            frame_step=config.get("frame_step", 1),
+            fast_tracking=config.get("fast_tracking", False),
+            progress_callback=progress_callback
         )
     
     def center_window(self, window):
@@ -0,0 +1,471 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Media Captioning Tool - Mask Export
+
+Module-level functions that only depend on precomputed polygons, so they
+can be pickled and run in worker processes.
+"""
+
+import os
+import queue
+import hashlib
+import shutil
+import subprocess
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+import cv2
+import numpy as np
+from PIL import Image
+
+# pyclipper gives an exact polygon offset (splitting or removing shrunk pieces); fall back to moving vertices along their normals
+try:
+    import pyclipper
+except ImportError:
+    pyclipper = None
+
+def read_video_info(video_path):
+    """Read (width, height, fps, total_frames) of a video without decoding its frames"""
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        return None
+    
+    width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+    height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+    fps = cap.get(cv2.CAP_PROP_FPS)
+    total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    
+    # Some containers do not report a frame count; count packets with ffprobe (demux only) or by grabbing
+    if total_frames <= 0:
+        total_frames = count_video_packets(video_path)
+        if total_frames is None:
+            total_frames = 0
+            while cap.grab():
+                total_frames += 1
+    
+    cap.release()
+    return width, height, fps, total_frames
+
+# Export keys live in the user cache rather than next to the masks, so dataset folders only hold masks
+EXPORT_CACHE_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'simple-media-caption', 'export')
+
+# Bump when the mask video encoding changes, so videos written the old way are exported again
+MASK_VIDEO_VERSION = 2
+
+def mask_export_key(polys, size, options, fps=None, total_frames=None):
+    """Hash everything a mask file is rendered from, so unchanged masks can be skipped on re-export"""
+    key = hashlib.blake2b(digest_size=16)
+    video_version = MASK_VIDEO_VERSION if fps is not None else None
+    key.update(repr((size, fps, total_frames, video_version, sorted(options.items()))).encode('utf-8'))
+    for points in polys:
+        points = np.ascontiguousarray(points)
+        key.update(repr((points.dtype.str, points.shape)).encode('utf-8'))
+        key.update(points.tobytes())
+    return key.hexdigest()
+
+def _export_key_path(mask_path):
+    """File in EXPORT_CACHE_DIR holding the export key of mask_path (named after its absolute path)"""
+    name = hashlib.blake2b(os.path.abspath(mask_path).encode('utf-8'), digest_size=16).hexdigest()
+    return os.path.join(EXPORT_CACHE_DIR, name + '.key')
+
+def _export_record(mask_path, key):
+    """Key plus the mask file's size and mtime, so a file rewritten (or half written) since is not trusted"""
+    stat = os.stat(mask_path)
+    return f"{key} {stat.st_size} {stat.st_mtime_ns}"
+
+def is_export_current(mask_path, key):
+    """Whether mask_path exists and was rendered from inputs with this key"""
+    try:
+        with open(_export_key_path(mask_path), 'r', encoding='ascii') as f:
+            return f.read() == _export_record(mask_path, key)
+    except OSError:
+        return False
+
+def mark_export_current(mask_path, key):
+    """Record the key of a freshly written mask_path"""
+    key_path = _export_key_path(mask_path)
+    os.makedirs(os.path.dirname(key_path), exist_ok=True)
+    with open(key_path, 'w', encoding='ascii') as f:
+        f.write(_export_record(mask_path, key))
+
+def count_video_packets(video_path):
+    """Count the video packets of a file with ffprobe without decoding them; None if ffprobe is unavailable"""
+    ffprobe = shutil.which('ffprobe')
+    if not ffprobe:
+        return None
+    
+    try:
+        result = subprocess.run(
+            [ffprobe, '-v', 'error', '-select_streams', 'v:0', '-count_packets',
+             '-show_entries', 'stream=nb_read_packets', '-of', 'csv=p=0', video_path],
+            stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, timeout=60
+        )
+        return int(result.stdout.split()[0])
+    except (OSError, subprocess.SubprocessError, ValueError, IndexError):
+        return None
+
+# Threads rasterizing video mask frames (fillPoly and GaussianBlur release the GIL)
+RASTER_WORKERS = min(4, os.cpu_count() or 1)
+
+# Number of mask frames in flight between the rasterizers and the writer thread
+PIPELINE_DEPTH = RASTER_WORKERS + 2
+
+def init_export_worker(raster_workers):
+    """Process pool initializer: give each worker process its share of the CPUs instead of a full set of threads"""
+    global RASTER_WORKERS, PIPELINE_DEPTH
+    
+    # Parallelism comes from the processes and raster threads, so OpenCV's own pool would only oversubscribe
+    cv2.setNumThreads(1)
+    RASTER_WORKERS = raster_workers
+    PIPELINE_DEPTH = raster_workers + 2
+
+# Masks are flat regions, so fast PNG deflate (level 1) is barely larger than higher levels
+# and much faster (pinned since older OpenCV defaults to 3); WebP quality above 100 is lossless
+IMAGE_ENCODE_PARAMS = {
+    '.png': [cv2.IMWRITE_PNG_COMPRESSION, 1],
+    '.webp': [cv2.IMWRITE_WEBP_QUALITY, 101],
+}
+
+# Blurring only the region around the polygons stops paying off once it covers this much of the frame
+BLUR_ROI_MAX_COVERAGE = 0.7
+
+# GOP=1 keeps every frame seekable; lossless encoding keeps mask edges and blurred values exact
+# and skips rate-distortion work. Lossless H.264 needs the High 4:4:4 Predictive profile, which
+# some players cannot decode; training pipelines read it through FFmpeg like any other file.
+# libx264 encodes the gray frames directly as 4:0:0 (odd sizes included)
+X264_ARGS = ['-c:v', 'libx264', '-preset', 'ultrafast', '-g', '1', '-qp', '0', '-pix_fmt', 'gray']
+# NVENC has no gray input; full-range 4:2:0 keeps every 0-255 value (limited range squeezes them into 16-235)
+NVENC_ARGS = ['-c:v', 'h264_nvenc', '-preset', 'p1', '-tune', 'lossless', '-g', '1',
+              '-vf', 'scale=out_range=full', '-pix_fmt', 'yuv420p', '-color_range', 'pc']
+# FFV1 in Matroska, for mask videos exported as .mkv
+FFV1_ARGS = ['-c:v', 'ffv1', '-level', '3', '-g', '1', '-pix_fmt', 'gray']
+
+@lru_cache(maxsize=None)
+def encodes_losslessly(ffmpeg, encoder_args, ext):
+    """Whether a gray test pattern encoded with encoder_args into an ext file decodes back unchanged"""
+    pattern = np.tile(np.arange(256, dtype=np.uint8), (256, 1)).tobytes()
+    
+    with tempfile.TemporaryDirectory() as temp_dir:
+        path = os.path.join(temp_dir, 'probe' + ext)
+        try:
+            encode = subprocess.run(
+                [ffmpeg, '-hide_banner', '-loglevel', 'error',
+                 '-f', 'rawvideo', '-pix_fmt', 'gray', '-s', '256x256', '-i', '-']
+                + list(encoder_args) + [path],
+                input=pattern, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, timeout=10
+            )
+            if encode.returncode != 0:
+                return False
+            
+            decode = subprocess.run(
+                [ffmpeg, '-hide_banner', '-loglevel', 'error', '-i', path,
+                 '-f', 'rawvideo', '-pix_fmt', 'gray', '-'],
+                stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, timeout=10
+            )
+        except (OSError, subprocess.SubprocessError):
+            return False
+    
+    return decode.returncode == 0 and decode.stdout == pattern
+
+def ffmpeg_encoder_args(ffmpeg, ext, size):
+    """Pick the first encoder that round-trips exactly on this machine (FFV1 for .mkv, else NVENC, then libx264); None if none does"""
+    width, height = size
+    if ext.lower() == '.mkv':
+        candidates = [FFV1_ARGS]
+    elif width % 2 == 0 and height % 2 == 0:
+        candidates = [NVENC_ARGS, X264_ARGS]
+    else:
+        # NVENC's 4:2:0 output needs even dimensions
+        candidates = [X264_ARGS]
+    
+    for encoder_args in candidates:
+        if encodes_losslessly(ffmpeg, tuple(encoder_args), ext.lower()):
+            return encoder_args
+    return None
+
+class MaskVideoWriter:
+    """
+    Write grayscale mask frames losslessly through ffmpeg (H.264 for .mp4, FFV1 for .mkv).
+    
+    Without a working ffmpeg, OpenCV's encoders are used instead: .mkv stays lossless FFV1
+    (cropped to even dimensions), while .mp4 falls back to lossy H.264/MPEG-4.
+    """
+    
+    def __init__(self, path, fps, size):
+        width, height = size
+        self.proc = None
+        self.out = None
+        
+        ext = os.path.splitext(path)[1]
+        ffmpeg = shutil.which('ffmpeg')
+        encoder_args = ffmpeg_encoder_args(ffmpeg, ext, size) if ffmpeg else None
+        if encoder_args:
+            self.proc = subprocess.Popen(
+                [ffmpeg, '-y', '-loglevel', 'error',
+                 '-f', 'rawvideo', '-pix_fmt', 'gray', '-s', f'{width}x{height}', '-r', str(fps), '-i', '-']
+                + encoder_args + [path],
+                stdin=subprocess.PIPE
+            )
+        elif ext.lower() == '.mkv':
+            self.out = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'FFV1'), fps, (width, height), False)
+        else:
+            # Lossy: try OpenCV's own FFmpeg H.264 encoder (hardware accelerated if possible), then mp4v
+            if hasattr(cv2, 'VIDEOWRITER_PROP_HW_ACCELERATION'):
+                self.out = cv2.VideoWriter(
+                    path, cv2.CAP_FFMPEG, cv2.VideoWriter_fourcc(*'avc1'), fps, (width, height),
+                    [cv2.VIDEOWRITER_PROP_IS_COLOR, 0,
+                     cv2.VIDEOWRITER_PROP_HW_ACCELERATION, cv2.VIDEO_ACCELERATION_ANY]
+                )
+            if self.out is None or not self.out.isOpened():
+                fourcc = cv2.VideoWriter_fourcc(*'mp4v')
+                self.out = cv2.VideoWriter(path, fourcc, fps, (width, height), False)
+    
+    def write(self, frame):
+        """Write a single C-contiguous uint8 (height, width) frame"""
+        if self.proc:
+            # Send the array's buffer directly instead of copying it with tobytes()
+            self.proc.stdin.write(frame.data)
+        else:
+            self.out.write(frame)
+    
+    def release(self):
+        """Flush and close the encoder"""
+        if self.proc:
+            self.proc.stdin.close()
+            if self.proc.wait() != 0:
+                raise RuntimeError(f"ffmpeg exited with code {self.proc.returncode}")
+        else:
+            self.out.release()
+
+def offset_along_normals(points, offset):
+    """
+    Move each polygon vertex along the miter of its two edge normals (positive=expand, negative=shrink).
+    
+    Accepts a single (points, 2) polygon or a stack of shape (..., points, 2)
+    and returns an int32 array of the same shape.
+    """
+    points_array = np.asarray(points, dtype=np.float64)
+    
+    # Edge i runs from vertex i to vertex i+1; rotate it 90 degrees to get its normal
+    edges = np.roll(points_array, -1, axis=-2) - points_array
+    normals = np.stack([edges[..., 1], -edges[..., 0]], axis=-1)
+    
+    # Normalize (repeated vertices give zero-length edges, whose normals stay zero)
+    lengths = np.linalg.norm(normals, axis=-1, keepdims=True)
+    normals = np.divide(normals, lengths, out=np.zeros_like(normals), where=lengths > 0)
+    
+    # Point the normals outwards whatever the winding, using the sign of the shoelace area
+    area = np.sum(points_array[..., 0] * np.roll(points_array[..., 1], -1, axis=-1)
+                  - np.roll(points_array[..., 0], -1, axis=-1) * points_array[..., 1], axis=-1)
+    normals *= np.where(area < 0, -1.0, 1.0)[..., np.newaxis, np.newaxis]
+    
+    # Vertex i joins edges i-1 and i; (n1 + n2) / (1 + n1.n2) keeps both edges offset by the
+    # same distance, with the miter limited to twice the offset at sharp corners
+    previous_normals = np.roll(normals, 1, axis=-2)
+    cos_angle = np.sum(normals * previous_normals, axis=-1, keepdims=True)
+    miters = (normals + previous_normals) / np.maximum(1 + cos_angle, 0.5)
+    
+    # Apply offset
+    return (points_array + miters * offset).astype(np.int32)
+
+def offset_polygon(points, offset):
+    """
+    Offset a polygon by the given amount (positive=expand, negative=shrink).
+    
+    Returns a list of int32 (points, 2) arrays: shrinking a concave polygon can
+    split it into several pieces or remove it entirely.
+    """
+    points_array = np.asarray(points).astype(np.int32)
+    if offset == 0 or len(points_array) < 3:
+        return [points_array]
+    
+    if pyclipper is None:
+        return [offset_along_normals(points_array, offset)]
+    
+    # Proper Minkowski offset, correct for concave polygons too
+    clipper_offset = pyclipper.PyclipperOffset()
+    clipper_offset.AddPath(points_array.tolist(), pyclipper.JT_ROUND, pyclipper.ET_CLOSEDPOLYGON)
+    return [np.asarray(path, dtype=np.int32) for path in clipper_offset.Execute(offset)]
+
+def offset_frames(frames_points, offset):
+    """Offset a (frames, points, 2) polygon stack, returning a list of polygon lists per frame"""
+    if pyclipper is None:
+        # The normal-based fallback keeps the point count, so offset every frame in one pass
+        return [[points] for points in offset_along_normals(frames_points, offset)]
+    
+    # Masks are held constant before the first and after the last keyframe, so reuse the
+    # previous result while the polygon is unchanged instead of offsetting it again
+    offset_polys = []
+    previous_points = None
+    for points in frames_points:
+        if previous_points is None or not np.array_equal(points, previous_points):
+            polys = offset_polygon(points, offset)
+            previous_points = points
+        offset_polys.append(polys)
+    
+    return offset_polys
+
+def _blur_roi(polys, blur_amount, shape):
+    """Region (x0, y0, x1, y1) around the polygons that blurring can change, or None if it covers most of the frame"""
+    if not polys:
+        return None
+    
+    # Pad by the kernel radius (plus one pixel) so the region's border is all background
+    x, y, w, h = cv2.boundingRect(np.concatenate(polys))
+    margin = blur_amount + 1
+    height, width = shape
+    x0, y0 = max(x - margin, 0), max(y - margin, 0)
+    x1, y1 = min(x + w + margin, width), min(y + h + margin, height)
+    
+    if x1 <= x0 or y1 <= y0 or (x1 - x0) * (y1 - y0) > BLUR_ROI_MAX_COVERAGE * width * height:
+        return None
+    return x0, y0, x1, y1
+
+def render_mask(mask_frame, polys, blur_frame=None, blur_amount=3, mask_intensity=255, invert_mask=False):
+    """Rasterize int32 polygons into the preallocated mask_frame and return the final uint8 mask"""
+    # Without blur, inverting is the same as drawing the inverted colors, which saves a full-frame pass
+    invert_when_drawing = invert_mask and blur_frame is None
+    if invert_when_drawing:
+        mask_frame.fill(255)
+        color = 255 - mask_intensity
+    else:
+        mask_frame.fill(0)
+        color = mask_intensity
+    
+    # Fill all polygons with white (or specified intensity) in one call
+    if polys:
+        cv2.fillPoly(mask_frame, polys, color, lineType=cv2.LINE_8)
+    
+    output_frame = mask_frame
+    
+    # Apply blur if requested
+    if blur_frame is not None:
+        ksize = (blur_amount*2+1, blur_amount*2+1)
+        roi = _blur_roi(polys, blur_amount, mask_frame.shape)
+        if roi is None:
+            output_frame = cv2.GaussianBlur(output_frame, ksize, 0, dst=blur_frame)
+        else:
+            # Only blur around the polygons; the margin is blank, so the result matches a full-frame blur
+            x0, y0, x1, y1 = roi
+            blur_frame.fill(0)
+            cv2.GaussianBlur(mask_frame[y0:y1, x0:x1], ksize, 0, dst=blur_frame[y0:y1, x0:x1])
+            output_frame = blur_frame
+    
+    # Invert the blurred mask if requested (in place, the buffer is rewritten next time)
+    if invert_mask and not invert_when_drawing:
+        output_frame = cv2.bitwise_not(output_frame, dst=output_frame)
+    
+    return output_frame
+
+def export_video_mask(mask_path, frames_polys, total_frames, fps, size, mask_offset=0, blur_mask=False,
+                      blur_amount=3, mask_intensity=255, invert_mask=False):
+    """
+    Render a mask video from per-frame polygons.
+    
+    Parameters:
+    -----------
+    mask_path : str
+        Path of the output mask video
+    frames_polys : list
+        One int32 array of shape (frames, points, 2) per mask
+    total_frames : int
+        Number of frames to write
+    fps : float
+        Frame rate of the output video
+    size : tuple
+        (width, height) of the output video
+    """
+    width, height = size
+    
+    # Create output video writer
+    out = MaskVideoWriter(mask_path, fps, (width, height))
+    
+    # Rasterize on a thread pool while a writer thread encodes in frame order; cv2 and pipe writes release the GIL
+    free_buffers = queue.Queue()
+    for _ in range(PIPELINE_DEPTH):
+        mask_frame = np.zeros((height, width), dtype=np.uint8)
+        blur_frame = np.empty_like(mask_frame) if blur_mask and blur_amount > 0 else None
+        free_buffers.put((mask_frame, blur_frame))
+    
+    ready_frames = queue.Queue()
+    errors = []
+    
+    def writer():
+        while True:
+            item = ready_frames.get()
+            if item is None:
+                return
+            
+            future, buffers = item
+            if not errors:
+                try:
+                    # Write the mask frame (futures are queued in frame order)
+                    out.write(future.result())
+                except Exception as e:
+                    errors.append(e)
+            
+            # Hand the buffers back to the rasterizer
+            free_buffers.put(buffers)
+    
+    writer_thread = threading.Thread(target=writer, daemon=True)
+    writer_thread.start()
+    
+    raster_pool = ThreadPoolExecutor(max_workers=RASTER_WORKERS)
+    
+    try:
+        # Apply offset to the polygons of all frames up front if needed
+        if mask_offset != 0:
+            frames_polys = [offset_frames(frames_points, mask_offset) for frames_points in frames_polys]
+        
+        # Process each frame
+        for frame_idx in range(total_frames):
+            if errors:
+                break
+            
+            mask_frame, blur_frame = buffers = free_buffers.get()
+            if mask_offset != 0:
+                polys = [poly for frames in frames_polys for poly in frames[frame_idx]]
+            else:
+                polys = [frames_points[frame_idx] for frames_points in frames_polys]
+            future = raster_pool.submit(render_mask, mask_frame, polys, blur_frame, blur_amount,
+                                        mask_intensity, invert_mask)
+            ready_frames.put((future, buffers))
+    finally:
+        ready_frames.put(None)
+        writer_thread.join()
+        raster_pool.shutdown()
+        
+        # Release video resources
+        out.release()
+    
+    if errors:
+        raise errors[0]
+
+def export_image_masks(items, size, mask_offset=0, blur_mask=False, blur_amount=3,
+                       mask_intensity=255, invert_mask=False):
+    """Render mask images of the same size from (mask_path, polys) items, reusing one buffer"""
+    width, height = size
+    
+    # Allocate the mask and blur buffers once for the whole batch
+    mask_frame = np.zeros((height, width), dtype=np.uint8)
+    blur_frame = np.empty_like(mask_frame) if blur_mask and blur_amount > 0 else None
+    
+    for mask_path, polys in items:
+        polys = [poly for points in polys for poly in offset_polygon(points, mask_offset)]
+        output_frame = render_mask(mask_frame, polys, blur_frame, blur_amount, mask_intensity, invert_mask)
+        
+        # Save the mask image (imencode + tofile also handles non-ASCII paths on Windows)
+        try:
+            ext = os.path.splitext(mask_path)[1]
+            ok, encoded = cv2.imencode(ext, output_frame, IMAGE_ENCODE_PARAMS.get(ext.lower(), []))
+        except cv2.error:
+            ok = False
+        
+        if ok:
+            encoded.tofile(mask_path)
+        else:
+            # OpenCV builds without an encoder for this format (e.g. GIF) go through PIL
+            Image.fromarray(output_frame).save(mask_path)
@@ -6,6 +6,55 @@ Media Captioning Tool - Mask Manager
 """
 
 import tkinter as tk
+import numpy as np
+from PIL import Image, ImageDraw, ImageTk
+
+# numba compiles the per-frame interpolation loop; fall back to np.interp if missing
+try:
+    from numba import njit
+except ImportError:
+    njit = None
+
+def points_to_array(points):
+    """Convert polygon points to the contiguous float32 (N, 2) array stored in keyframes"""
+    return np.ascontiguousarray(points, dtype=np.float32).reshape(-1, 2)
+
+def _interp_frames(frames_kf, points_kf, num_frames):
+    """Linearly interpolate (keyframes, points, 2) keyframe points for every frame (clamped at both ends)"""
+    frames = np.arange(num_frames, dtype=np.float64)
+    
+    # Index of the keyframe at or before each frame, and of the one after it
+    prev_idx = np.clip(np.searchsorted(frames_kf, frames, side='right') - 1, 0, len(frames_kf) - 1)
+    next_idx = np.minimum(prev_idx + 1, len(frames_kf) - 1)
+    
+    # Blend factor, clamped so frames outside the keyframe range hold the nearest keyframe
+    span = np.maximum(frames_kf[next_idx] - frames_kf[prev_idx], 1)
+    factor = np.clip((frames - frames_kf[prev_idx]) / span, 0, 1)[:, np.newaxis, np.newaxis]
+    
+    return points_kf[prev_idx] * (1 - factor) + points_kf[next_idx] * factor
+
+if njit:
+    @njit(cache=True, fastmath=True)
+    def _interp_frames(frames_kf, points_kf, num_frames):
+        """Linearly interpolate (keyframes, points, 2) keyframe points for every frame (clamped at both ends)"""
+        num_keyframes, num_points = points_kf.shape[0], points_kf.shape[1]
+        interpolated = np.empty((num_frames, num_points, 2), dtype=np.float64)
+        
+        k = 0
+        for frame in range(num_frames):
+            # Advance to the keyframe segment containing this frame
+            while k < num_keyframes - 1 and frames_kf[k + 1] <= frame:
+                k += 1
+            
+            if frame <= frames_kf[0]:
+                interpolated[frame] = points_kf[0]
+            elif k == num_keyframes - 1:
+                interpolated[frame] = points_kf[k]
+            else:
+                factor = (frame - frames_kf[k]) / (frames_kf[k + 1] - frames_kf[k])
+                interpolated[frame] = points_kf[k] + (points_kf[k + 1] - points_kf[k]) * factor
+        
+        return interpolated
 
 class MaskManager:
     def __init__(self, app, canvas):
@@ -29,6 +78,11 @@ class MaskManager:
         self.show_fill = True
         self.show_outline = True
         
+        # Offscreen buffer that all masks are drawn into, shown by a single canvas item
+        self.overlay_image = None
+        self.overlay_draw = None
+        self.overlay_photo = None
+        
         # Bind canvas events
         self.canvas.bind("<Button-1>", self.on_canvas_click)
         self.canvas.bind("<Motion>", self.on_canvas_motion)
@@ -361,25 +415,45 @@ class MaskManager:
         
         # If we're before the first keyframe or after the last keyframe
         if not prev_keyframe:
-            return mask['keyframes'][0]['points'].copy()
+            return np.asarray(mask['keyframes'][0]['points']).tolist()
         if not next_keyframe:
-            return mask['keyframes'][-1]['points'].copy()
+            return np.asarray(mask['keyframes'][-1]['points']).tolist()
         
         # Calculate interpolation factor
         total_frames = next_keyframe['frame'] - prev_keyframe['frame']
         if total_frames == 0:
-            return prev_keyframe['points']
+            return np.asarray(prev_keyframe['points']).tolist()
         
         factor = (frame - prev_keyframe['frame']) / total_frames
         
         # Interpolate between points
-        interpolated_points = []
-        for prev_point, next_point in zip(prev_keyframe['points'], next_keyframe['points']):
-            x = prev_point[0] + (next_point[0] - prev_point[0]) * factor
-            y = prev_point[1] + (next_point[1] - prev_point[1]) * factor
-            interpolated_points.append((x, y))
+        prev_points = np.asarray(prev_keyframe['points'], dtype=np.float64)
+        next_points = np.asarray(next_keyframe['points'], dtype=np.float64)
+        num_points = min(len(prev_points), len(next_points))
+        prev_points = prev_points[:num_points]
+        interpolated_points = prev_points + (next_points[:num_points] - prev_points) * factor
         
-        return interpolated_points
+        return interpolated_points.tolist()
+    
+    def precompute_interpolated(self, mask, num_frames):
+        """Get interpolated points for every frame as an int32 array of shape (frames, points, 2)"""
+        if not mask['keyframes']:
+            return np.zeros((num_frames, 0, 2), dtype=np.int32)
+        
+        # Keep the last keyframe for each frame number, as get_interpolated_points does
+        keyframes = sorted(mask['keyframes'], key=lambda k: k['frame'])
+        points_by_frame = {keyframe['frame']: keyframe['points'] for keyframe in keyframes}
+        
+        # Stack keyframes into a (keyframes, points, 2) array
+        num_points = min(len(points) for points in points_by_frame.values())
+        frames_kf = np.array(list(points_by_frame.keys()), dtype=np.float64)
+        points_kf = np.array([np.asarray(points, dtype=np.float64).reshape(-1, 2)[:num_points]
+                              for points in points_by_frame.values()])
+        
+        # Interpolate each coordinate along the frame axis (clamped outside the keyframe range)
+        interpolated = _interp_frames(frames_kf, points_kf, num_frames)
+        
+        return interpolated.astype(np.int32)
     
     def update_frame(self, frame):
         """Update the current frame for interpolation"""
@@ -395,13 +469,34 @@ class MaskManager:
         if not self.app.current_media:
             return
         
-        # Clear existing masks
-        self.canvas.delete("mask")
-        
         # Get masks for current media
         media_id = self.app.current_media['id']
         masks = self.app.current_project.get('masks', {}).get(media_id, [])
         
+        # Nothing to render; just drop any overlay left from the previous media
+        if not masks:
+            self.clear_overlay()
+            return
+        
+        viewer = self.app.media_viewer
+        width = int(viewer.media_width * viewer.scale_factor)
+        height = int(viewer.media_height * viewer.scale_factor)
+        if width <= 0 or height <= 0:
+            self.clear_overlay()
+            return
+        
+        # Reuse the offscreen buffer unless the displayed media size changed
+        if self.overlay_image is None or self.overlay_image.size != (width, height):
+            self.overlay_image = Image.new('RGBA', (width, height), (0, 0, 0, 0))
+            self.overlay_draw = ImageDraw.Draw(self.overlay_image)
+            self.overlay_photo = None
+        else:
+            self.overlay_draw.rectangle((0, 0, width, height), fill=(0, 0, 0, 0))
+        
+        # Resolve colors once per redraw
+        fill = self.get_rgba(self.fill_color, self.fill_opacity) if self.show_fill else None
+        outline = self.get_rgba(self.outline_color, 1.0) if self.show_outline else None
+        
         for mask in masks:
             # Skip the mask being edited
             if self.editing_mask_id and mask['id'] == self.editing_mask_id:
@@ -412,37 +507,41 @@ class MaskManager:
             if len(points) < 3:
                 continue
             
-            # Convert media coordinates to canvas coordinates and flatten
-            flat_points = []
-            for x, y in points:
-                canvas_x, canvas_y = self.app.media_viewer.media_to_canvas_coords(x, y)
-                flat_points.extend([canvas_x, canvas_y])
-            
-            # Create the polygon
-            fill = self.fill_color if self.show_fill else ""
-            outline = self.outline_color if self.show_outline else ""
+            # Convert media coordinates to overlay coordinates
+            overlay_points = [(x * viewer.scale_factor, y * viewer.scale_factor) for x, y in points]
             
-            # Apply opacity using stipple pattern
-            stipple = ""
-            if self.show_fill and self.fill_opacity < 1.0:
-                if self.fill_opacity < 0.25:
-                    stipple = "gray12"
-                elif self.fill_opacity < 0.5:
-                    stipple = "gray25"
-                elif self.fill_opacity < 0.75:
-                    stipple = "gray50"
-                else:
-                    stipple = "gray75"
-            
-            self.canvas.create_polygon(
-                flat_points,
-                fill=fill,
-                outline=outline,
-                width=self.outline_width,
-                tags=("mask", f"mask_{mask['id']}"),
-                stipple=stipple
+            if fill:
+                self.overlay_draw.polygon(overlay_points, fill=fill)
+            if outline:
+                self.overlay_draw.line(overlay_points + overlay_points[:1], fill=outline, width=self.outline_width)
+        
+        # Blit the buffer onto the canvas through a single image item
+        if self.overlay_photo is None:
+            self.overlay_photo = ImageTk.PhotoImage(self.overlay_image)
+        else:
+            self.overlay_photo.paste(self.overlay_image)
+        
+        items = self.canvas.find_withtag("mask")
+        if items:
+            self.canvas.itemconfig(items[0], image=self.overlay_photo)
+            self.canvas.coords(items[0], viewer.offset_x, viewer.offset_y)
+        else:
+            self.canvas.create_image(
+                viewer.offset_x, viewer.offset_y,
+                anchor=tk.NW,
+                image=self.overlay_photo,
+                tags="mask"
             )
         
         # If we're editing a mask, redraw the editing polygon
         if self.active_tool in ["edit", "keyframe"] and self.current_points:
-            self.update_polygon() 
\ No newline at end of file
+            self.update_polygon()
+    
+    def clear_overlay(self):
+        """Remove the mask overlay from the canvas"""
+        self.canvas.delete("mask")
+    
+    def get_rgba(self, color, opacity):
+        """Convert a Tk color and an opacity (0-1) to an RGBA tuple"""
+        r, g, b = self.canvas.winfo_rgb(color)
+        return (r >> 8, g >> 8, b >> 8, int(round(opacity * 255)))
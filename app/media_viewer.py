@@ -13,6 +13,8 @@ import cv2
 import threading
 import time
 
+from app.video_io import open_video_capture
+
 class MediaViewer(ttk.Frame):
     def __init__(self, parent, app):
         super().__init__(parent)
@@ -94,8 +96,8 @@ class MediaViewer(ttk.Frame):
     def load_video(self):
         """Load and display a video"""
         try:
-            # Open video with OpenCV
-            self.video_capture = cv2.VideoCapture(self.media_path)
+            # Open video with OpenCV, decoding on the GPU/fixed-function hardware when available
+            self.video_capture = open_video_capture(self.media_path)
             
             if not self.video_capture.isOpened():
                 raise ValueError("Could not open video file")
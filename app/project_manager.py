@@ -10,6 +10,36 @@ import json
 import shutil
 from tkinter import messagebox
 
+import numpy as np
+
+from app.mask_manager import points_to_array
+from app.video_io import clear_gray_frame_cache
+
+# orjson parses and serializes large projects much faster; fall back to json if missing
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+def loads_project(data):
+    """Parse project file contents (bytes)"""
+    if orjson:
+        return orjson.loads(data)
+    return json.loads(data)
+
+def _json_default(obj):
+    """Serialize keyframe point arrays as nested lists"""
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+def dumps_project(project_data):
+    """Serialize project data to indented JSON bytes"""
+    if orjson:
+        return orjson.dumps(project_data, default=_json_default,
+                            option=orjson.OPT_INDENT_2 | orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(project_data, indent=2, default=_json_default).encode('utf-8')
+
 class ProjectManager:
     def __init__(self, app):
         self.app = app
@@ -17,8 +47,8 @@ class ProjectManager:
     def load_project(self, file_path):
         """Load a project from a JSON file"""
         try:
-            with open(file_path, 'r') as f:
-                project_data = json.load(f)
+            with open(file_path, 'rb') as f:
+                project_data = loads_project(f.read())
             
             # Validate project data
             if not isinstance(project_data, dict) or 'media_path' not in project_data:
@@ -32,12 +62,20 @@ class ProjectManager:
                     "Please update the media path after loading."
                 )
             
+            # Keep keyframe points as arrays in memory
+            for masks in project_data.get('masks', {}).values():
+                for mask in masks:
+                    for keyframe in mask['keyframes']:
+                        keyframe['points'] = points_to_array(keyframe['points'])
+            
             # Set file path in project data
             project_data['file_path'] = file_path
             
             # Update application state
             self.app.current_project = project_data
             self.app.current_media = None
+            self.app.rebuild_mask_index()
+            clear_gray_frame_cache()
             self.app.update_ui_state()
             
             messagebox.showinfo("Success", f"Project loaded from {file_path}")
@@ -62,8 +100,8 @@ class ProjectManager:
                 caption = self.app.caption_text.get(1.0, "end-1c")
                 project_data['media_files'][media_id]['caption'] = caption
             
-            with open(file_path, 'w') as f:
-                json.dump(project_data, f, indent=2)
+            with open(file_path, 'wb') as f:
+                f.write(dumps_project(project_data))
             
             # Update file path in current project
             self.app.current_project['file_path'] = file_path
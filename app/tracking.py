@@ -1,21 +1,277 @@
 import cv2
+import hashlib
 import numpy as np
 import os
+from concurrent.futures import ThreadPoolExecutor
 
-def track_points_with_lk_and_kalman(video_path, initial_points):
+from app.video_io import open_video_capture, open_gray_frames
+
+# numba compiles the per-sample Kalman updates and the per-vertex consensus filter; fall back to batched NumPy if missing
+try:
+    from numba import njit
+except ImportError:
+    njit = None
+
+# Tracking results are kept here, keyed by the video, the initial points and the tracker parameters
+TRACK_CACHE_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'simple-media-caption', 'track')
+
+# Least recently used tracking results are deleted once TRACK_CACHE_DIR grows past this
+TRACK_CACHE_MAX_BYTES = 256 * 1024 * 1024
+
+# Bump whenever the tracking math changes, so results cached by an older tracker are not replayed
+TRACKER_CACHE_VERSION = 2
+
+# Fast tracking halves frames taller than this when the mask covers less than FAST_TRACKING_MAX_COVERAGE of them
+FAST_TRACKING_MIN_HEIGHT = 1080
+FAST_TRACKING_MAX_COVERAGE = 0.25
+
+# Filter method ids passed to consensus_filter, so the kernel does not compare strings
+FILTER_AVERAGE = 0
+FILTER_CONSENSUS = 1
+
+_lk_executor = None
+
+def get_lk_executor():
+    """Return the shared thread pool used to run optical flow for several window sizes at once"""
+    global _lk_executor
+    if _lk_executor is None:
+        _lk_executor = ThreadPoolExecutor(max_workers=os.cpu_count() or 1)
+    return _lk_executor
+
+# Constant-velocity model shared by the Kalman filters of all sample points
+KALMAN_TRANSITION = np.array([
+    [1, 0, 1, 0],
+    [0, 1, 0, 1],
+    [0, 0, 1, 0],
+    [0, 0, 0, 1]
+], np.float32)
+KALMAN_MEASUREMENT = np.array([[1, 0, 0, 0], [0, 1, 0, 0]], np.float32)
+KALMAN_PROCESS_NOISE = np.diag([1e-4, 1e-4, 1e-3, 1e-3]).astype(np.float32)
+KALMAN_MEASUREMENT_NOISE = np.eye(2, dtype=np.float32) * 1e-3
+
+def kalman_predict(state, cov, idx):
+    """Advance the (N, 4) states and (N, 4, 4) covariances selected by idx one step, in place"""
+    state[idx] = state[idx] @ KALMAN_TRANSITION.T
+    cov[idx] = KALMAN_TRANSITION @ cov[idx] @ KALMAN_TRANSITION.T + KALMAN_PROCESS_NOISE
+
+def kalman_correct(state, cov, idx, measurements):
+    """Correct the predicted states selected by idx with (len(idx), 2) measurements, in place"""
+    cov_sel = cov[idx]
+    
+    # Gain K = P H^T (H P H^T + R)^-1, computed as a batched solve since P and S are symmetric
+    h_cov = KALMAN_MEASUREMENT @ cov_sel
+    innovation_cov = h_cov @ KALMAN_MEASUREMENT.T + KALMAN_MEASUREMENT_NOISE
+    gain = np.linalg.solve(innovation_cov, h_cov).transpose(0, 2, 1)
+    
+    innovation = measurements - state[idx] @ KALMAN_MEASUREMENT.T
+    state[idx] += (gain @ innovation[:, :, np.newaxis])[:, :, 0]
+    cov[idx] = cov_sel - gain @ h_cov
+
+if njit:
+    @njit(cache=True, fastmath=True)
+    def kalman_predict(state, cov, idx):
+        """Advance the (N, 4) states and (N, 4, 4) covariances selected by idx one step, in place"""
+        for n in idx:
+            # x' = F x for the constant-velocity model
+            state[n, 0] += state[n, 2]
+            state[n, 1] += state[n, 3]
+            
+            # P' = F P F^T + Q, written out as loops (numba's matmul would need SciPy's BLAS)
+            fp = np.zeros((4, 4), dtype=cov.dtype)
+            for r in range(4):
+                for c in range(4):
+                    for k in range(4):
+                        fp[r, c] += KALMAN_TRANSITION[r, k] * cov[n, k, c]
+            for r in range(4):
+                for c in range(4):
+                    total = KALMAN_PROCESS_NOISE[r, c]
+                    for k in range(4):
+                        total += fp[r, k] * KALMAN_TRANSITION[c, k]
+                    cov[n, r, c] = total
+    
+    @njit(cache=True, fastmath=True)
+    def kalman_correct(state, cov, idx, measurements):
+        """Correct the predicted states selected by idx with (len(idx), 2) measurements, in place"""
+        for m in range(len(idx)):
+            n = idx[m]
+            p = cov[n]
+            
+            # H selects (x, y), so S = P[:2, :2] + R and K = P[:, :2] S^-1, with S inverted in closed form
+            s00 = p[0, 0] + KALMAN_MEASUREMENT_NOISE[0, 0]
+            s01 = p[0, 1] + KALMAN_MEASUREMENT_NOISE[0, 1]
+            s10 = p[1, 0] + KALMAN_MEASUREMENT_NOISE[1, 0]
+            s11 = p[1, 1] + KALMAN_MEASUREMENT_NOISE[1, 1]
+            det = s00 * s11 - s01 * s10
+            i00, i01, i10, i11 = s11 / det, -s01 / det, -s10 / det, s00 / det
+            
+            gain = np.empty((4, 2), dtype=p.dtype)
+            for r in range(4):
+                gain[r, 0] = p[r, 0] * i00 + p[r, 1] * i10
+                gain[r, 1] = p[r, 0] * i01 + p[r, 1] * i11
+            
+            dx = measurements[m, 0] - state[n, 0]
+            dy = measurements[m, 1] - state[n, 1]
+            for r in range(4):
+                state[n, r] += gain[r, 0] * dx + gain[r, 1] * dy
+            
+            # P = P - K H P (compute from a copy since cov[n] is updated in place)
+            h_cov = p[:2].copy()
+            for r in range(4):
+                for c in range(4):
+                    p[r, c] -= gain[r, 0] * h_cov[0, c] + gain[r, 1] * h_cov[1, c]
+
+def consensus_filter(positions, valid, initial_points, points_per_vertex, threshold, method_id):
+    """
+    Combine the tracked samples of each vertex into one position.
+    
+    positions is (W, N*K, 2) and valid is (W, N*K), one row per window size, with the K samples
+    of each of the N vertices next to each other. With FILTER_CONSENSUS and at least 3 valid samples,
+    samples whose movement from initial_points is further than threshold from the median movement
+    are dropped before averaging. Returns the (N, 2) filtered vertices and an (N,) mask of vertices
+    that had any valid sample.
+    """
+    num_vertices = len(initial_points)
+    
+    # Gather the samples of each vertex from all window sizes, window by window: (N, W*K)
+    num_samples = len(positions) * points_per_vertex
+    samples = positions.reshape(len(positions), num_vertices, points_per_vertex, 2).transpose(1, 0, 2, 3).reshape(num_vertices, num_samples, 2)
+    selected = valid.reshape(len(valid), num_vertices, points_per_vertex).transpose(1, 0, 2).reshape(num_vertices, num_samples)
+    counts = selected.sum(axis=1)
+    
+    no_consensus = np.zeros(num_vertices, dtype=bool)
+    median = None
+    if method_id == FILTER_CONSENSUS:
+        use_consensus = counts >= 3
+        movement = samples[use_consensus] - initial_points[use_consensus, np.newaxis]
+        movement[~selected[use_consensus]] = np.nan
+        median = np.nanmedian(movement, axis=1)
+        
+        # Comparisons with the NaN of invalid samples are False, so those stay out
+        inliers = (np.abs(movement - median[:, np.newaxis]) < threshold).all(axis=2)
+        selected = selected.copy()
+        selected[use_consensus] = inliers
+        no_consensus[use_consensus] = ~inliers.any(axis=1)
+    
+    # Average the selected samples
+    num_selected = selected.sum(axis=1)
+    filtered = np.where(selected[:, :, np.newaxis], samples, 0.0).sum(axis=1) / np.maximum(num_selected, 1)[:, np.newaxis]
+    
+    # If no consensus, use the original position plus median movement
+    if no_consensus.any():
+        filtered[no_consensus] = initial_points[no_consensus] + median[no_consensus[use_consensus]]
+    
+    return filtered, counts > 0
+
+if njit:
+    @njit(cache=True)
+    def consensus_filter(positions, valid, initial_points, points_per_vertex, threshold, method_id):
+        """
+        Combine the tracked samples of each vertex into one position.
+        
+        positions is (W, N*K, 2) and valid is (W, N*K), one row per window size, with the K samples
+        of each of the N vertices next to each other. With FILTER_CONSENSUS and at least 3 valid samples,
+        samples whose movement from initial_points is further than threshold from the median movement
+        are dropped before averaging. Returns the (N, 2) filtered vertices and an (N,) mask of vertices
+        that had any valid sample.
+        """
+        num_windows = positions.shape[0]
+        num_vertices = initial_points.shape[0]
+        filtered = np.empty((num_vertices, 2))
+        found = np.zeros(num_vertices, dtype=np.bool_)
+        
+        # Positions and movement of the valid samples of the current vertex
+        xs = np.empty(num_windows * points_per_vertex)
+        ys = np.empty(num_windows * points_per_vertex)
+        dx = np.empty(num_windows * points_per_vertex)
+        dy = np.empty(num_windows * points_per_vertex)
+        
+        for i in range(num_vertices):
+            start_idx = i * points_per_vertex
+            end_idx = start_idx + points_per_vertex
+            
+            count = 0
+            sum_x = 0.0
+            sum_y = 0.0
+            for w in range(num_windows):
+                for j in range(start_idx, end_idx):
+                    if valid[w, j]:
+                        xs[count] = positions[w, j, 0]
+                        ys[count] = positions[w, j, 1]
+                        dx[count] = xs[count] - initial_points[i, 0]
+                        dy[count] = ys[count] - initial_points[i, 1]
+                        sum_x += xs[count]
+                        sum_y += ys[count]
+                        count += 1
+            
+            if count == 0:
+                continue
+            found[i] = True
+            
+            if method_id != FILTER_CONSENSUS or count < 3:
+                # Use simple average
+                filtered[i, 0] = sum_x / count
+                filtered[i, 1] = sum_y / count
+                continue
+            
+            median_dx = np.median(dx[:count])
+            median_dy = np.median(dy[:count])
+            
+            # Average the samples that moved like the median
+            inliers = 0
+            sum_x = 0.0
+            sum_y = 0.0
+            for k in range(count):
+                if abs(dx[k] - median_dx) < threshold and abs(dy[k] - median_dy) < threshold:
+                    sum_x += xs[k]
+                    sum_y += ys[k]
+                    inliers += 1
+            
+            if inliers > 0:
+                filtered[i, 0] = sum_x / inliers
+                filtered[i, 1] = sum_y / inliers
+            else:
+                # If no consensus, use the original position plus median movement
+                filtered[i, 0] = initial_points[i, 0] + median_dx
+                filtered[i, 1] = initial_points[i, 1] + median_dy
+        
+        return filtered, found
+
+def make_sample_points(vertices, vertex_offsets):
+    """Place vertex_offsets (K, 2) around each of the (N, 2) vertices, as an (N*K, 1, 2) float32 array for LK"""
+    vertices = np.asarray(vertices, dtype=np.float64).reshape(-1, 2)
+    return (vertices[:, np.newaxis, :] + vertex_offsets).reshape(-1, 1, 2).astype(np.float32)
+
+def track_points_with_lk_and_kalman(video_path, initial_points, progress_callback=None):
     """
     Track points using a combination of Lucas-Kanade optical flow with Kalman filtering
     for smoother, more stable tracking results.
     """
     # Use the improved tracking algorithm instead
-    return track_points_with_consensus(video_path, initial_points)
+    return track_points_with_consensus(video_path, initial_points, progress_callback=progress_callback)
 
 def track_points_with_consensus(video_path, initial_points, use_shifted_points=True, 
-                               shift_value=5, window_sizes=None, filter_method="consensus"):
+                               shift_value=5, window_sizes=None, filter_method="consensus",
+                               progress_callback=None):
     """
     Enhanced tracking algorithm that uses multiple sample points around each vertex
     and consensus-based filtering for more reliable tracking.
     
+    Returns the tracked vertices of every frame as a list; see iter_points_with_consensus
+    for the parameters and for a streaming version.
+    """
+    return [points for _, points in iter_points_with_consensus(
+        video_path, initial_points, use_shifted_points=use_shifted_points, shift_value=shift_value,
+        window_sizes=window_sizes, filter_method=filter_method, progress_callback=progress_callback
+    )]
+
+def iter_points_with_consensus(video_path, initial_points, use_shifted_points=True, 
+                               shift_value=5, window_sizes=None, filter_method="consensus",
+                               frame_step=1, fast_tracking=False, progress_callback=None):
+    """
+    Track points like track_points_with_consensus, yielding (frame_idx, vertices) per frame
+    as it goes instead of keeping the whole trajectory in memory. Vertices are a float64
+    (N, 2) array; lost vertices are NaN.
+    
     Parameters:
     -----------
     video_path : str
@@ -30,47 +286,54 @@ def track_points_with_consensus(video_path, initial_points, use_shifted_points=T
         List of window sizes for Lucas-Kanade optical flow
     filter_method : str
         Method for filtering results ('average' or 'consensus')
+    frame_step : int
+        Track only every frame_step-th frame; the frames in between are skipped
+    fast_tracking : bool
+        Track on half-size frames when the video is large and the mask covers a small part of it
+    progress_callback : callable
+        Optional function called as progress_callback(frame_idx, total_frames)
+        after each tracked frame; may be invoked from a worker thread
     """
-    cap = cv2.VideoCapture(video_path)
-    ret, first_frame = cap.read()
-    if not ret:
-        cap.release()
-        return []
-
-    # Convert first frame to grayscale
-    prev_gray = cv2.cvtColor(first_frame, cv2.COLOR_BGR2GRAY)
+    total_frames, gray_frames = open_gray_frames(video_path, frame_step)
+    
+    # Get the first frame in grayscale
+    prev_gray = next(gray_frames, None)
+    if prev_gray is None:
+        return
     
     # Set default window sizes if not provided
     if window_sizes is None or len(window_sizes) == 0:
         window_sizes = [21]
     
-    # Generate sample points around each vertex
-    sample_points = []
-    sample_offsets = []  # Store offsets for each sample point
+    initial_points = np.asarray(initial_points, dtype=np.float64).reshape(-1, 2)
+    
+    # Track in half-size coordinates when fast tracking applies; results are scaled back when yielded
+    scale = 1.0
+    if fast_tracking and prev_gray.shape[0] > FAST_TRACKING_MIN_HEIGHT and len(initial_points) > 0:
+        bbox_size = initial_points.max(axis=0) - initial_points.min(axis=0)
+        if bbox_size[0] * bbox_size[1] < FAST_TRACKING_MAX_COVERAGE * prev_gray.size:
+            scale = 0.5
     
-    for point in initial_points:
-        x, y = point
-        # Center point
-        sample_points.append((x, y))
-        sample_offsets.append((0, 0))
+    if scale != 1.0:
+        def downscale(frame):
+            return cv2.resize(frame, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
         
-        # Add shifted points if enabled
-        if use_shifted_points:
-            # Up, down, left, right
-            sample_points.append((x, y - shift_value))  # Up
-            sample_offsets.append((0, -shift_value))
-            
-            sample_points.append((x, y + shift_value))  # Down
-            sample_offsets.append((0, shift_value))
-            
-            sample_points.append((x - shift_value, y))  # Left
-            sample_offsets.append((-shift_value, 0))
-            
-            sample_points.append((x + shift_value, y))  # Right
-            sample_offsets.append((shift_value, 0))
+        prev_gray = downscale(prev_gray)
+        gray_frames = map(downscale, gray_frames)
+        initial_points = initial_points * scale
+        shift_value = shift_value * scale
+    
+    # Offsets of the sample points around each vertex: center, then up, down, left, right if enabled
+    if use_shifted_points:
+        vertex_offsets = np.array([(0, 0), (0, -shift_value), (0, shift_value), (-shift_value, 0), (shift_value, 0)])
+    else:
+        vertex_offsets = np.array([(0, 0)])
     
-    # Convert sample points to numpy array for LK tracker
-    np_sample_points = np.array(sample_points, dtype=np.float32).reshape(-1, 1, 2)
+    # Offset of each sample point, in the same order as the samples
+    sample_offsets = np.tile(vertex_offsets, (len(initial_points), 1))
+    
+    # Generate sample points around each vertex for the LK tracker
+    np_sample_points = make_sample_points(initial_points, vertex_offsets)
     
     # Create a list of Lucas-Kanade parameter sets for each window size
     lk_params_list = []
@@ -81,32 +344,15 @@ def track_points_with_consensus(video_path, initial_points, use_shifted_points=T
             criteria=(cv2.TERM_CRITERIA_EPS | cv2.TERM_CRITERIA_COUNT, 30, 0.01)
         ))
     
-    # Initialize Kalman filters for each sample point
-    kalman_filters = []
-    for _ in range(len(np_sample_points)):
-        kf = cv2.KalmanFilter(4, 2)
-        kf.measurementMatrix = np.array([[1, 0, 0, 0], [0, 1, 0, 0]], np.float32)
-        kf.transitionMatrix = np.array([
-            [1, 0, 1, 0],
-            [0, 1, 0, 1],
-            [0, 0, 1, 0],
-            [0, 0, 0, 1]
-        ], np.float32)
-        kf.processNoiseCov = np.array([
-            [1e-4, 0, 0, 0],
-            [0, 1e-4, 0, 0],
-            [0, 0, 1e-3, 0],
-            [0, 0, 0, 1e-3]
-        ], np.float32)
-        kf.measurementNoiseCov = np.array([[1, 0], [0, 1]], np.float32) * 1e-3
-        kalman_filters.append(kf)
-    
-    # Initialize Kalman states with initial positions
-    for i, point in enumerate(np_sample_points):
-        kalman_filters[i].statePost = np.array([[point[0][0]], [point[0][1]], [0], [0]], np.float32)
-    
-    # Store all tracked points (only the original vertices, not the sample points)
-    tracked_points = [[tuple(p) for p in initial_points]]
+    # Batched constant-velocity Kalman filters, one per sample point: state (x, y, vx, vy)
+    kalman_state = np.zeros((len(np_sample_points), 4), dtype=np.float32)
+    kalman_state[:, :2] = np_sample_points[:, 0, :]
+    kalman_cov = np.zeros((len(np_sample_points), 4, 4), dtype=np.float32)
+    
+    # Vertices of the last frame (only the original vertices, not the sample points)
+    prev_vertices = initial_points
+    frame_idx = 0
+    yield frame_idx, prev_vertices / scale
     
     # Current sample points being tracked
     current_sample_points = np_sample_points.copy()
@@ -114,164 +360,174 @@ def track_points_with_consensus(video_path, initial_points, use_shifted_points=T
     # Calculate points per vertex (1 if not using shifted points, 5 if using)
     points_per_vertex = 5 if use_shifted_points else 1
     
+    method_id = FILTER_CONSENSUS if filter_method == "consensus" else FILTER_AVERAGE
+    
     # Track through the video
-    while True:
-        ret, frame = cap.read()
-        if not ret:
-            break
-            
-        # Convert current frame to grayscale
-        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+    for gray in gray_frames:
+        frame_idx += frame_step
         
         # If we have points to track
         if len(current_sample_points) > 0:
-            # Process each window size
-            all_next_points = []
-            all_statuses = []
+            # Calculate optical flow for each window size
+            def calc_flow(lk_params):
+                return cv2.calcOpticalFlowPyrLK(prev_gray, gray, current_sample_points, None, **lk_params)
             
-            for lk_params in lk_params_list:
-                # Calculate optical flow for this window size
-                next_points, status, _ = cv2.calcOpticalFlowPyrLK(
-                    prev_gray, gray, current_sample_points, None, **lk_params
-                )
-                all_next_points.append(next_points)
-                all_statuses.append(status)
+            # The window sizes are independent and OpenCV releases the GIL, so run them concurrently
+            if len(lk_params_list) > 1:
+                flows = list(get_lk_executor().map(calc_flow, lk_params_list))
+            else:
+                flows = [calc_flow(lk_params_list[0])]
             
-            # Process each original vertex
-            filtered_vertices = []
+            all_next_points = [next_points for next_points, _, _ in flows]
+            all_statuses = [status for _, status, _ in flows]
             
-            for i in range(len(initial_points)):
-                # Collect valid tracked samples from all window sizes
-                valid_samples = []
-                
-                # Process each window size
-                for w_idx, (next_points, status) in enumerate(zip(all_next_points, all_statuses)):
-                    # Get the sample points for this vertex
-                    start_idx = i * points_per_vertex
-                    end_idx = start_idx + points_per_vertex
-                    
-                    # Process each sample point
-                    for j in range(start_idx, min(end_idx, len(next_points))):
-                        if j < len(status) and status[j][0] == 1:
-                            # Apply Kalman filter
-                            predicted = kalman_filters[j].predict()
-                            measurement = np.array([[next_points[j][0][0]], [next_points[j][0][1]]], np.float32)
-                            kalman_filters[j].correct(measurement)
-                            filtered_pos = kalman_filters[j].statePost[:2].flatten()
-                            
-                            # Get the offset for this sample point
-                            sample_offset = sample_offsets[j % len(sample_offsets)]
-                            
-                            # Adjust position by removing the offset
-                            adjusted_pos = (
-                                float(filtered_pos[0]) - sample_offset[0],
-                                float(filtered_pos[1]) - sample_offset[1]
-                            )
-                            
-                            # Add to valid samples with window size info
-                            valid_samples.append((adjusted_pos, w_idx))
+            # Run the Kalman filters of all samples tracked by each window size, one window size at a time
+            window_positions = np.empty((len(lk_params_list), len(sample_offsets), 2))
+            window_valid = np.empty((len(lk_params_list), len(sample_offsets)), dtype=bool)
+            for w_idx, (next_points, status) in enumerate(zip(all_next_points, all_statuses)):
+                valid = status[:, 0] == 1
+                valid_idx = np.flatnonzero(valid)
+                kalman_predict(kalman_state, kalman_cov, valid_idx)
+                kalman_correct(kalman_state, kalman_cov, valid_idx, next_points[valid_idx, 0, :])
                 
-                # If we have valid samples, apply filtering
-                if valid_samples:
-                    # Extract positions (without window size info)
-                    positions = [pos for pos, _ in valid_samples]
-                    
-                    if filter_method == "consensus" and len(positions) >= 3:
-                        # Calculate movement vectors for each sample
-                        original_pos = initial_points[i]
-                        movement_vectors = []
-                        
-                        for pos in positions:
-                            dx = pos[0] - original_pos[0]
-                            dy = pos[1] - original_pos[1]
-                            movement_vectors.append((dx, dy))
-                        
-                        # Calculate median movement
-                        median_dx = np.median([v[0] for v in movement_vectors])
-                        median_dy = np.median([v[1] for v in movement_vectors])
-                        
-                        # Identify outliers
-                        threshold = 10  # Threshold for outlier detection
-                        consensus_samples = []
-                        
-                        for j, (dx, dy) in enumerate(movement_vectors):
-                            if (abs(dx - median_dx) < threshold and 
-                                abs(dy - median_dy) < threshold):
-                                consensus_samples.append(positions[j])
-                        
-                        # Calculate average position from consensus samples
-                        if consensus_samples:
-                            avg_x = sum(p[0] for p in consensus_samples) / len(consensus_samples)
-                            avg_y = sum(p[1] for p in consensus_samples) / len(consensus_samples)
-                            filtered_vertices.append((avg_x, avg_y))
-                        else:
-                            # If no consensus, use the original position plus median movement
-                            filtered_vertices.append((
-                                original_pos[0] + median_dx,
-                                original_pos[1] + median_dy
-                            ))
-                    else:
-                        # Use simple average
-                        avg_x = sum(p[0] for p in positions) / len(positions)
-                        avg_y = sum(p[1] for p in positions) / len(positions)
-                        filtered_vertices.append((avg_x, avg_y))
-                else:
-                    # No valid samples, use Kalman prediction for the center point
-                    center_idx = i * points_per_vertex  # Index of the center point
-                    if center_idx < len(kalman_filters):
-                        predicted = kalman_filters[center_idx].predict()
-                        filtered_pos = predicted[:2].flatten()
-                        filtered_vertices.append((float(filtered_pos[0]), float(filtered_pos[1])))
-                    else:
-                        # If all else fails, use the last known position
-                        if len(tracked_points) > 0 and i < len(tracked_points[-1]):
-                            filtered_vertices.append(tracked_points[-1][i])
-                        else:
-                            filtered_vertices.append(None)
+                # Adjust positions by removing the sample offsets
+                np.subtract(kalman_state[:, :2], sample_offsets, out=window_positions[w_idx])
+                window_valid[w_idx] = valid
             
-            # Save vertices for this frame
-            tracked_points.append(filtered_vertices)
+            # Combine the valid samples of each vertex from all window sizes
+            filtered_vertices, found = consensus_filter(
+                window_positions, window_valid, initial_points, points_per_vertex, 10 * scale, method_id
+            )
             
-            # Update sample points for next iteration
-            new_sample_points = []
-            new_sample_offsets = []
+            # Vertices without valid samples use the Kalman prediction of their center sample
+            for i in np.flatnonzero(~found):
+                center_idx = i * points_per_vertex
+                kalman_predict(kalman_state, kalman_cov, np.array([center_idx]))
+                filtered_vertices[i] = kalman_state[center_idx, :2]
             
-            for i, vertex in enumerate(filtered_vertices):
-                if vertex is not None:
-                    x, y = vertex
-                    # Center point
-                    new_sample_points.append([x, y])
-                    new_sample_offsets.append((0, 0))
-                    
-                    # Add shifted points if enabled
-                    if use_shifted_points:
-                        new_sample_points.append([x, y - shift_value])  # Up
-                        new_sample_offsets.append((0, -shift_value))
-                        
-                        new_sample_points.append([x, y + shift_value])  # Down
-                        new_sample_offsets.append((0, shift_value))
-                        
-                        new_sample_points.append([x - shift_value, y])  # Left
-                        new_sample_offsets.append((-shift_value, 0))
-                        
-                        new_sample_points.append([x + shift_value, y])  # Right
-                        new_sample_offsets.append((shift_value, 0))
+            # Save vertices for this frame
+            prev_vertices = filtered_vertices
             
-            if new_sample_points:
-                current_sample_points = np.array(new_sample_points, dtype=np.float32).reshape(-1, 1, 2)
-                sample_offsets = new_sample_offsets
-            else:
-                current_sample_points = np.array([], dtype=np.float32)
-                sample_offsets = []
+            # Update sample points for next iteration (lost vertices stay as NaN so samples keep their slots)
+            current_sample_points = make_sample_points(prev_vertices, vertex_offsets)
         else:
-            # If all points are lost, add None for all vertices
-            tracked_points.append([None] * len(initial_points))
+            # If all points are lost, mark all vertices as NaN
+            prev_vertices = np.full((len(initial_points), 2), np.nan)
         
-        # Update previous frame
-        prev_gray = gray.copy()
+        # Update previous frame (frames are never modified, so no copy is needed)
+        prev_gray = gray
         
-    cap.release()
-    return tracked_points
+        yield frame_idx, prev_vertices / scale
+        
+        # Report progress
+        if progress_callback:
+            progress_callback(frame_idx + 1, total_frames)
+
+def track_cache_path(video_path, initial_points, params):
+    """Return the cache file for tracking initial_points through video_path with params (changes with the video's mtime)"""
+    stat = os.stat(video_path)
+    key = hashlib.blake2b(digest_size=16)
+    # The numba and NumPy Kalman filters round differently, so their results are cached separately
+    key.update(repr((TRACKER_CACHE_VERSION, njit is not None, os.path.abspath(video_path),
+                     stat.st_mtime_ns, stat.st_size, sorted(params.items()))).encode('utf-8'))
+    key.update(np.ascontiguousarray(initial_points, dtype=np.float64).tobytes())
+    return os.path.join(TRACK_CACHE_DIR, key.hexdigest() + '.trk')
+
+def prune_track_cache(max_bytes=None):
+    """Delete the least recently used (oldest mtime) tracking results until TRACK_CACHE_DIR fits in max_bytes"""
+    if max_bytes is None:
+        max_bytes = TRACK_CACHE_MAX_BYTES
+    
+    # Every finished entry counts, including .npz files left by older versions; in-progress .tmp files are skipped
+    entries = []
+    try:
+        with os.scandir(TRACK_CACHE_DIR) as it:
+            for entry in it:
+                if entry.name.endswith('.tmp') or not entry.is_file():
+                    continue
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime_ns, stat.st_size, entry.path))
+    except OSError:
+        return
+    
+    total_bytes = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total_bytes <= max_bytes:
+            break
+        try:
+            os.remove(path)
+        except OSError:
+            continue
+        total_bytes -= size
+
+def track_record_dtype(num_points):
+    """One cache record per tracked frame: the frame index and its (num_points, 2) vertices"""
+    return np.dtype([('frame', '<i8'), ('points', '<f8', (num_points, 2))])
+
+def iter_points_cached(video_path, initial_points, progress_callback=None, **params):
+    """
+    Like iter_points_with_consensus, but replay the result of an earlier identical run from disk.
+    
+    Each frame is appended to a temporary file as it is tracked, so memory stays at one frame;
+    runs that are consumed to the end are then moved into TRACK_CACHE_DIR. The keyword
+    parameters are passed on to iter_points_with_consensus.
+    """
+    cache_path = track_cache_path(video_path, initial_points, params)
+    record = np.zeros(1, dtype=track_record_dtype(len(np.asarray(initial_points).reshape(-1, 2))))
+    
+    try:
+        records = np.fromfile(cache_path, dtype=record.dtype)
+    except (OSError, ValueError):
+        records = None
+    
+    if records is not None and len(records) > 0:
+        # Mark the entry as recently used so pruning keeps it
+        try:
+            os.utime(cache_path)
+        except OSError:
+            pass
+        
+        if progress_callback:
+            progress_callback(1, 1)
+        yield from zip(records['frame'].tolist(), records['points'])
+        return
+    
+    # Write to a temporary file first so an interrupted run never leaves a partial cache entry
+    temp_path = cache_path + '.tmp'
+    try:
+        os.makedirs(TRACK_CACHE_DIR, exist_ok=True)
+        cache_file = open(temp_path, 'wb')
+    except OSError:
+        cache_file = None
+    
+    completed = False
+    try:
+        for frame_idx, points in iter_points_with_consensus(video_path, initial_points,
+                                                            progress_callback=progress_callback, **params):
+            if cache_file:
+                record['frame'] = frame_idx
+                record['points'] = points
+                try:
+                    cache_file.write(record.tobytes())
+                except OSError:
+                    cache_file.close()
+                    cache_file = None
+            yield frame_idx, points
+        completed = True
+    finally:
+        if cache_file:
+            cache_file.close()
+            try:
+                if completed and os.path.getsize(temp_path) > 0:
+                    os.replace(temp_path, cache_path)
+                    prune_track_cache()
+                else:
+                    os.remove(temp_path)
+            except OSError:
+                pass
 
 def render_tracked_points(video_path, initial_points, output_path, use_shifted_points=True, 
                           shift_value=5, window_sizes=None, filter_method="consensus"):
@@ -306,7 +562,7 @@ def render_tracked_points(video_path, initial_points, output_path, use_shifted_p
     )
     
     # Open the input video
-    cap = cv2.VideoCapture(video_path)
+    cap = open_video_capture(video_path)
     if not cap.isOpened():
         raise ValueError("Cannot open the video file.")
 
@@ -332,7 +588,7 @@ def render_tracked_points(video_path, initial_points, output_path, use_shifted_p
         if frame_idx < len(tracked_points):
             # Update history with current points
             for i, pt in enumerate(tracked_points[frame_idx]):
-                if pt is not None and i < len(history):
+                if not np.isnan(pt).any() and i < len(history):
                     history[i].append((int(pt[0]), int(pt[1])))
                     # Keep only recent history
                     if len(history[i]) > max_history:
@@ -351,7 +607,7 @@ def render_tracked_points(video_path, initial_points, output_path, use_shifted_p
             
             # Draw current points with a larger, more visible circle
             for i, pt in enumerate(tracked_points[frame_idx]):
-                if pt is not None and i < len(initial_points):
+                if not np.isnan(pt).any() and i < len(initial_points):
                     # Current point in bright green with larger size
                     cv2.circle(frame, (int(pt[0]), int(pt[1])), 7, (0, 255, 0), -1)
                     # Add a label if desired
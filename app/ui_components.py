@@ -35,14 +35,26 @@ class FileListPanel(ttk.Frame):
         
         # Store file list
         self.files = []
+        
+        # Directory and modification time of the last scan
+        self._last_loaded_path = None
+        self._last_mtime = None
     
     def load_files(self, directory):
         """Load media files from the given directory"""
-        self.clear()
-        
         if not directory or not os.path.isdir(directory):
+            self.clear()
             return
         
+        # Skip the rescan if the directory has not changed since the last load
+        mtime = os.path.getmtime(directory)
+        if directory == self._last_loaded_path and mtime == self._last_mtime:
+            return
+        
+        self.clear()
+        self._last_loaded_path = directory
+        self._last_mtime = mtime
+        
         # Get all files in the directory
         all_files = os.listdir(directory)
         
@@ -67,10 +79,16 @@ class FileListPanel(ttk.Frame):
         if 0 <= index < len(self.files):
             self.app.select_media(self.files[index])
     
+    def invalidate(self):
+        """Force the next load_files call to rescan the directory"""
+        self._last_loaded_path = None
+        self._last_mtime = None
+    
     def clear(self):
         """Clear the file list"""
         self.listbox.delete(0, tk.END)
         self.files = []
+        self.invalidate()
 
 
 class MaskListPanel(ttk.Frame):
@@ -110,6 +128,9 @@ class MaskListPanel(ttk.Frame):
         self.track_button = ttk.Button(self.button_frame, text="Track Mask", command=self.on_track_mask, state=tk.DISABLED)
         self.track_button.pack(side=tk.LEFT, padx=2)
         
+        self.track_all_button = ttk.Button(self.button_frame, text="Track All", command=self.on_track_all_masks, state=tk.DISABLED)
+        self.track_all_button.pack(side=tk.LEFT, padx=2)
+        
         self.delete_button = ttk.Button(self.button_frame, text="Delete", command=self.on_delete_mask, state=tk.DISABLED)
         self.delete_button.pack(side=tk.LEFT, padx=2)
         
@@ -198,6 +219,8 @@ class MaskListPanel(ttk.Frame):
             self.keyframe_button.config(state=tk.DISABLED)
             self.track_button.config(state=tk.DISABLED)
             self.delete_button.config(state=tk.DISABLED)
+        
+        self.track_all_button.config(state=tk.NORMAL if self.masks else tk.DISABLED)
     
     def get_selected_mask(self):
         """Get the currently selected mask"""
@@ -321,6 +344,14 @@ class MaskListPanel(ttk.Frame):
                                      "This will track the mask vertices across all frames and create keyframes. Continue?"):
                 self.app.track_mask(mask['id'])
     
+    def on_track_all_masks(self):
+        """Handle track all masks button click"""
+        if self.masks:
+            # Confirm tracking operation
+            if tk.messagebox.askyesno("Track All Masks", 
+                                     "This will track the vertices of all masks across all frames and create keyframes. Continue?"):
+                self.app.track_all_masks()
+    
     def set_keyframe_mode(self, keyframing):
         """Set the keyframe mode state"""
         self.editing_mask = keyframing
@@ -332,6 +363,7 @@ class MaskListPanel(ttk.Frame):
         self.masks = []
         self.editing_mask = False
         self.update_ui_state()
+        self.update_button_states()
 
 
 class ControlPanel(ttk.Frame):
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Media Captioning Tool - Video I/O helpers shared by the viewer and the tracker
+"""
+
+import os
+import cv2
+
+# Default memory budget for keeping the decoded grayscale frames of the last tracked video
+# (about 10 s of 1080p); the tracking dialog can change it and the frames are dropped when
+# another video or project is opened
+GRAY_FRAME_CACHE_BYTES = 512 * 1024 * 1024
+
+_gray_frame_cache = {}
+_gray_frame_cache_bytes = GRAY_FRAME_CACHE_BYTES
+
+def open_video_capture(video_path):
+    """Open a video for sequential reading, decoding on the GPU/fixed-function hardware when available"""
+    # Hardware decoding parameters need OpenCV 4.5.2+; ANY silently falls back to software decoding
+    if hasattr(cv2, 'VIDEO_ACCELERATION_ANY'):
+        cap = cv2.VideoCapture(video_path, cv2.CAP_FFMPEG,
+                               [cv2.CAP_PROP_HW_ACCELERATION, cv2.VIDEO_ACCELERATION_ANY])
+        if cap.isOpened():
+            return cap
+        cap.release()
+    
+    return cv2.VideoCapture(video_path)
+
+def open_gray_frames(video_path, step=1):
+    """
+    Return (total_frames, iterator over every step-th grayscale frame) for a video.
+    
+    The frames of the last fully read video are kept in memory (up to the budget set with
+    set_gray_frame_cache_budget), so tracking the same clip again does not decode it again.
+    """
+    stat = os.stat(video_path)
+    key = (os.path.abspath(video_path), stat.st_mtime, stat.st_size)
+    
+    frames = _gray_frame_cache.get(key)
+    if frames is not None:
+        return len(frames), iter(frames[::step])
+    
+    # Release the previous video's frames before decoding another one
+    _gray_frame_cache.clear()
+    
+    cap = open_video_capture(video_path)
+    total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    
+    def decode_sparse():
+        try:
+            while True:
+                # Skipped frames are only demuxed, not decoded
+                ret, frame = cap.read()
+                if not ret:
+                    break
+                
+                yield cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+                
+                for _ in range(step - 1):
+                    if not cap.grab():
+                        return
+        finally:
+            cap.release()
+    
+    if step > 1:
+        return total_frames, decode_sparse()
+    
+    def decode():
+        frames = []
+        cached_bytes = 0
+        try:
+            while True:
+                ret, frame = cap.read()
+                if not ret:
+                    break
+                
+                gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+                
+                # Stop collecting once the video no longer fits in the cache
+                if frames is not None:
+                    cached_bytes += gray.nbytes
+                    if cached_bytes <= _gray_frame_cache_bytes:
+                        frames.append(gray)
+                    else:
+                        frames = None
+                
+                yield gray
+        finally:
+            cap.release()
+        
+        # Only cache videos that were read to the end; keep a single video to bound memory
+        if frames is not None:
+            _gray_frame_cache.clear()
+            _gray_frame_cache[key] = frames
+    
+    return total_frames, decode()
+
+def clear_gray_frame_cache():
+    """Drop the cached grayscale frames, e.g. when another video or project is opened"""
+    _gray_frame_cache.clear()
+
+def set_gray_frame_cache_budget(max_bytes):
+    """Set how many bytes of decoded frames open_gray_frames may keep (0 disables the cache)"""
+    global _gray_frame_cache_bytes
+    _gray_frame_cache_bytes = max_bytes
+    
+    # Drop cached frames that no longer fit
+    if sum(frame.nbytes for frames in _gray_frame_cache.values() for frame in frames) > max_bytes:
+        _gray_frame_cache.clear()
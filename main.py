@@ -5,10 +5,16 @@
 Media Captioning Tool - Main Application Entry Point
 """
 
+import os
 import tkinter as tk
+import cv2
 from app.application import MediaCaptioningApp
 
 if __name__ == "__main__":
+    # Leave one core for the UI thread; calls made while OpenCV's pool is busy (e.g. the
+    # concurrent LK window sizes) run their parallel loops serially, so threads stay bounded
+    cv2.setNumThreads(max(1, (os.cpu_count() or 2) - 1))
+    
     root = tk.Tk()
     root.title("Media Captioning Tool")
     root.geometry("1200x800")
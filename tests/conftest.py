@@ -0,0 +1,39 @@
+"""
+Shared test setup and fixtures
+"""
+
+import importlib.util
+import os
+import sys
+
+import pytest
+
+# Make the app package importable when running pytest from the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+def load_without_numba(module_name):
+    """Load a separate copy of an app module with numba hidden, so its NumPy fallbacks are defined"""
+    saved = sys.modules.get('numba', False)
+    sys.modules['numba'] = None
+    try:
+        spec = importlib.util.find_spec(module_name)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+    finally:
+        if saved is False:
+            del sys.modules['numba']
+        else:
+            sys.modules['numba'] = saved
+    return module
+
+@pytest.fixture(params=['default', 'numpy'])
+def implementation(request):
+    """
+    Load app modules either as imported (numba kernels when numba is installed) or with the
+    NumPy fallbacks, so both code paths are checked against the same references.
+    """
+    def load(module_name):
+        if request.param == 'numpy':
+            return load_without_numba(module_name)
+        return importlib.import_module(module_name)
+    return load
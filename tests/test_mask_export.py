@@ -0,0 +1,126 @@
+"""
+Tests for app.mask_export polygon offsetting and export keys
+"""
+
+import os
+
+import numpy as np
+import pytest
+
+from app import mask_export
+from app.mask_export import (offset_along_normals, offset_frames, offset_polygon,
+                             mask_export_key, is_export_current, mark_export_current)
+
+SQUARE = np.array([(0, 0), (10, 0), (10, 10), (0, 10)])
+# Concave L shape with a reflex vertex at (4, 4)
+L_SHAPE = np.array([(0, 0), (10, 0), (10, 4), (4, 4), (4, 10), (0, 10)])
+
+@pytest.mark.parametrize('points, offset, expected', [
+    (SQUARE, 2, [(-2, -2), (12, -2), (12, 12), (-2, 12)]),
+    (SQUARE, -1, [(1, 1), (9, 1), (9, 9), (1, 9)]),
+    (L_SHAPE, 2, [(-2, -2), (12, -2), (12, 6), (6, 6), (6, 12), (-2, 12)]),
+    (L_SHAPE, -1, [(1, 1), (9, 1), (9, 3), (3, 3), (3, 9), (1, 9)]),
+])
+def test_offset_along_normals_moves_every_edge_by_offset(points, offset, expected):
+    result = offset_along_normals(points, offset)
+    assert result.dtype == np.int32
+    assert result.tolist() == [list(point) for point in expected]
+    
+    # Winding order does not matter
+    assert offset_along_normals(points[::-1], offset).tolist() == result[::-1].tolist()
+
+@pytest.mark.parametrize('points', [
+    [(0, 0), (0, 0), (10, 0), (10, 10)],  # repeated vertex
+    [(0, 0), (5, 0), (10, 0)],  # collinear, zero area
+    [(3, 3), (3, 3), (3, 3), (3, 3)],  # single point
+    [(0, 0), (30, 0), (0, 30)],  # sharp corners hit the miter limit
+])
+def test_offset_along_normals_degenerate_polygons(points):
+    points = np.array(points)
+    result = offset_along_normals(points, 3)
+    assert result.shape == points.shape
+    assert result.dtype == np.int32
+    
+    # The miter is capped at twice the offset
+    assert np.all(np.abs(result - points) <= 6)
+
+def test_offset_along_normals_stack_matches_single_polygons():
+    rng = np.random.default_rng(0)
+    stack = rng.integers(0, 200, size=(5, 7, 2))
+    result = offset_along_normals(stack, 4)
+    assert result.shape == stack.shape
+    for frame_points, frame_result in zip(stack, result):
+        np.testing.assert_array_equal(offset_along_normals(frame_points, 4), frame_result)
+
+@pytest.mark.parametrize('use_pyclipper', [False, True])
+def test_offset_frames_matches_offset_polygon(monkeypatch, use_pyclipper):
+    if use_pyclipper:
+        pytest.importorskip('pyclipper')
+    else:
+        monkeypatch.setattr(mask_export, 'pyclipper', None)
+    
+    # Held keyframes repeat the same polygon, which offset_frames reuses
+    frames_points = np.array([L_SHAPE, L_SHAPE, L_SHAPE + 5, SQUARE[[0, 1, 2, 3, 3, 3]]], dtype=np.int32)
+    for offset in (-2, 3):
+        result = offset_frames(frames_points, offset)
+        assert len(result) == len(frames_points)
+        for points, polys in zip(frames_points, result):
+            expected = offset_polygon(points, offset)
+            assert len(polys) == len(expected)
+            for poly, expected_poly in zip(polys, expected):
+                np.testing.assert_array_equal(poly, expected_poly)
+
+def test_offset_polygon_zero_offset_and_short_polygons():
+    np.testing.assert_array_equal(offset_polygon(L_SHAPE, 0)[0], L_SHAPE)
+    np.testing.assert_array_equal(offset_polygon([(0, 0), (5, 5)], 3)[0], [(0, 0), (5, 5)])
+
+OPTIONS = {'mask_offset': 0, 'blur_mask': False, 'blur_amount': 3, 'mask_intensity': 255, 'invert_mask': False}
+
+def test_mask_export_key_changes_with_every_input():
+    polys = [SQUARE.astype(np.int32)]
+    key = mask_export_key(polys, (64, 48), OPTIONS)
+    assert key == mask_export_key([SQUARE.astype(np.int32)], (64, 48), dict(OPTIONS))
+    
+    changed_keys = [
+        mask_export_key([(SQUARE + 1).astype(np.int32)], (64, 48), OPTIONS),
+        mask_export_key([SQUARE.astype(np.float32)], (64, 48), OPTIONS),
+        mask_export_key(polys + polys, (64, 48), OPTIONS),
+        mask_export_key(polys, (48, 64), OPTIONS),
+        mask_export_key(polys, (64, 48), dict(OPTIONS, mask_offset=2)),
+        mask_export_key(polys, (64, 48), OPTIONS, fps=25.0, total_frames=10),
+        mask_export_key(polys, (64, 48), OPTIONS, fps=30.0, total_frames=10),
+        mask_export_key(polys, (64, 48), OPTIONS, fps=25.0, total_frames=11),
+    ]
+    assert len(set(changed_keys + [key])) == len(changed_keys) + 1
+
+def test_export_current_tracks_key_and_file(tmp_path, monkeypatch):
+    cache_dir = tmp_path / 'cache'
+    monkeypatch.setattr(mask_export, 'EXPORT_CACHE_DIR', str(cache_dir))
+    export_dir = tmp_path / 'export'
+    export_dir.mkdir()
+    mask_path = str(export_dir / 'clip_mask.png')
+    
+    # Missing file and missing key
+    assert not is_export_current(mask_path, 'key')
+    
+    with open(mask_path, 'wb') as f:
+        f.write(b'mask')
+    assert not is_export_current(mask_path, 'key')
+    
+    mark_export_current(mask_path, 'key')
+    assert is_export_current(mask_path, 'key')
+    assert not is_export_current(mask_path, 'other')
+    
+    # Keys never end up in the export folder
+    assert os.listdir(export_dir) == ['clip_mask.png']
+    assert len(os.listdir(cache_dir)) == 1
+    
+    # A file rewritten since the key was recorded is not trusted
+    with open(mask_path, 'wb') as f:
+        f.write(b'new mask')
+    assert not is_export_current(mask_path, 'key')
+    
+    mark_export_current(mask_path, 'key')
+    stat = os.stat(mask_path)
+    os.utime(mask_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    assert not is_export_current(mask_path, 'key')
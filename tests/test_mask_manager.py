@@ -0,0 +1,44 @@
+"""
+Tests for app.mask_manager keyframe interpolation
+"""
+
+import numpy as np
+import pytest
+
+def reference_interp_frames(frames_kf, points_kf, num_frames):
+    """Per-coordinate np.interp, as precompute_interpolated did before _interp_frames"""
+    frames = np.arange(num_frames)
+    interpolated = np.empty((num_frames, points_kf.shape[1], 2), dtype=np.float64)
+    for i in range(points_kf.shape[1]):
+        interpolated[:, i, 0] = np.interp(frames, frames_kf, points_kf[:, i, 0])
+        interpolated[:, i, 1] = np.interp(frames, frames_kf, points_kf[:, i, 1])
+    return interpolated
+
+@pytest.mark.parametrize('frames_kf, num_frames', [
+    ([0], 5),  # single keyframe
+    ([0, 10], 11),
+    ([3, 7, 8, 20], 30),  # held before the first and after the last keyframe
+    ([0, 5, 40], 12),  # video shorter than the last keyframe
+    ([2, 3, 4, 5], 6),  # consecutive keyframes
+])
+def test_interp_frames_matches_np_interp(implementation, frames_kf, num_frames):
+    mask_manager = implementation('app.mask_manager')
+    
+    rng = np.random.default_rng(len(frames_kf) * 100 + num_frames)
+    frames_kf = np.array(frames_kf, dtype=np.float64)
+    points_kf = rng.uniform(0, 1000, size=(len(frames_kf), 6, 2))
+    
+    result = mask_manager._interp_frames(frames_kf, points_kf, num_frames)
+    np.testing.assert_allclose(result, reference_interp_frames(frames_kf, points_kf, num_frames), atol=1e-9)
+
+def test_interp_frames_random_keyframes(implementation):
+    mask_manager = implementation('app.mask_manager')
+    
+    rng = np.random.default_rng(0)
+    for _ in range(50):
+        frames_kf = np.sort(rng.choice(200, size=rng.integers(1, 12), replace=False)).astype(np.float64)
+        points_kf = rng.uniform(-500, 500, size=(len(frames_kf), rng.integers(3, 9), 2))
+        num_frames = int(rng.integers(1, 250))
+        
+        result = mask_manager._interp_frames(frames_kf, points_kf, num_frames)
+        np.testing.assert_allclose(result, reference_interp_frames(frames_kf, points_kf, num_frames), atol=1e-9)
@@ -0,0 +1,128 @@
+"""
+Tests for the app.tracking Kalman filters, consensus filter and result cache
+"""
+
+import os
+
+import numpy as np
+import pytest
+
+from app import tracking
+
+def reference_consensus_filter(positions, valid, initial_points, points_per_vertex, threshold, filter_method):
+    """Per-vertex Python loop, as iter_points_with_consensus filtered samples before consensus_filter"""
+    filtered = np.zeros((len(initial_points), 2))
+    found = np.zeros(len(initial_points), dtype=bool)
+    for i in range(len(initial_points)):
+        start_idx = i * points_per_vertex
+        samples = [tuple(window_positions[j])
+                   for window_positions, window_valid in zip(positions, valid)
+                   for j in range(start_idx, start_idx + points_per_vertex) if window_valid[j]]
+        if not samples:
+            continue
+        found[i] = True
+        
+        if filter_method == "consensus" and len(samples) >= 3:
+            original_pos = initial_points[i]
+            movement = [(x - original_pos[0], y - original_pos[1]) for x, y in samples]
+            median_dx = np.median([dx for dx, _ in movement])
+            median_dy = np.median([dy for _, dy in movement])
+            consensus = [samples[j] for j, (dx, dy) in enumerate(movement)
+                         if abs(dx - median_dx) < threshold and abs(dy - median_dy) < threshold]
+            if consensus:
+                filtered[i] = (sum(x for x, _ in consensus) / len(consensus),
+                               sum(y for _, y in consensus) / len(consensus))
+            else:
+                filtered[i] = (original_pos[0] + median_dx, original_pos[1] + median_dy)
+        else:
+            filtered[i] = (sum(x for x, _ in samples) / len(samples),
+                           sum(y for _, y in samples) / len(samples))
+    return filtered, found
+
+@pytest.mark.parametrize('filter_method', ['consensus', 'average'])
+def test_consensus_filter_matches_reference(implementation, filter_method):
+    tracking = implementation('app.tracking')
+    method_id = tracking.FILTER_CONSENSUS if filter_method == 'consensus' else tracking.FILTER_AVERAGE
+    
+    rng = np.random.default_rng(0)
+    for _ in range(500):
+        num_windows = int(rng.integers(1, 4))
+        num_vertices = int(rng.integers(1, 8))
+        points_per_vertex = int(rng.choice([1, 5]))
+        threshold = float(rng.choice([5.0, 10.0]))
+        
+        # Wide spreads and random validity produce outliers, empty vertices and vertices without consensus
+        positions = rng.normal(0, 8, size=(num_windows, num_vertices * points_per_vertex, 2)) * rng.choice([1, 5])
+        valid = rng.random((num_windows, num_vertices * points_per_vertex)) < rng.random()
+        initial_points = rng.normal(0, 3, size=(num_vertices, 2))
+        
+        filtered, found = tracking.consensus_filter(positions, valid, initial_points, points_per_vertex,
+                                                    threshold, method_id)
+        expected, expected_found = reference_consensus_filter(positions, valid, initial_points,
+                                                              points_per_vertex, threshold, filter_method)
+        
+        np.testing.assert_array_equal(found, expected_found)
+        np.testing.assert_array_equal(filtered[found], expected[found])
+
+def reference_kalman_step(state, cov, measurement):
+    """Textbook float64 predict and correct of one point, as cv2.KalmanFilter computed it"""
+    transition = tracking.KALMAN_TRANSITION.astype(np.float64)
+    measurement_matrix = tracking.KALMAN_MEASUREMENT.astype(np.float64)
+    
+    state = transition @ state
+    cov = transition @ cov @ transition.T + tracking.KALMAN_PROCESS_NOISE
+    predicted = state.copy(), cov.copy()
+    
+    innovation_cov = measurement_matrix @ cov @ measurement_matrix.T + tracking.KALMAN_MEASUREMENT_NOISE
+    gain = cov @ measurement_matrix.T @ np.linalg.inv(innovation_cov)
+    state = state + gain @ (measurement - measurement_matrix @ state)
+    cov = cov - gain @ measurement_matrix @ cov
+    return predicted, (state, cov)
+
+def test_kalman_filter_matches_reference(implementation):
+    tracking = implementation('app.tracking')
+    
+    rng = np.random.default_rng(0)
+    for _ in range(50):
+        num_points = int(rng.integers(1, 20))
+        
+        # Random states and symmetric positive definite covariances, updated for a random subset of points
+        state = rng.normal(0, 50, size=(num_points, 4)).astype(np.float32)
+        a = rng.normal(0, 0.1, size=(num_points, 4, 4))
+        cov = (a @ a.transpose(0, 2, 1) + np.eye(4) * 1e-2).astype(np.float32)
+        idx = np.sort(rng.choice(num_points, size=int(rng.integers(0, num_points + 1)), replace=False))
+        measurements = (state[idx, :2] + rng.normal(0, 2, size=(len(idx), 2))).astype(np.float32)
+        
+        predicted_state, predicted_cov = state.copy(), cov.copy()
+        tracking.kalman_predict(predicted_state, predicted_cov, idx)
+        corrected_state, corrected_cov = predicted_state.copy(), predicted_cov.copy()
+        tracking.kalman_correct(corrected_state, corrected_cov, idx, measurements)
+        
+        # Points outside idx are left untouched
+        untouched = np.setdiff1d(np.arange(num_points), idx)
+        np.testing.assert_array_equal(corrected_state[untouched], state[untouched])
+        np.testing.assert_array_equal(corrected_cov[untouched], cov[untouched])
+        
+        for m, n in enumerate(idx):
+            predicted, corrected = reference_kalman_step(state[n].astype(np.float64), cov[n].astype(np.float64),
+                                                         measurements[m].astype(np.float64))
+            np.testing.assert_allclose(predicted_state[n], predicted[0], rtol=1e-5, atol=1e-4)
+            np.testing.assert_allclose(predicted_cov[n], predicted[1], rtol=1e-5, atol=1e-6)
+            np.testing.assert_allclose(corrected_state[n], corrected[0], rtol=1e-5, atol=1e-4)
+            np.testing.assert_allclose(corrected_cov[n], corrected[1], rtol=1e-4, atol=1e-6)
+
+def test_prune_track_cache_deletes_least_recently_used(tmp_path, monkeypatch):
+    monkeypatch.setattr(tracking, 'TRACK_CACHE_DIR', str(tmp_path))
+    
+    # Four 100-byte entries used in order a, b, c, d, plus an in-progress write
+    for age, name in enumerate(['d.trk', 'c.trk', 'b.trk', 'a.npz']):
+        path = tmp_path / name
+        path.write_bytes(b'x' * 100)
+        os.utime(path, ns=(0, (1000 - age) * 1_000_000_000))
+    (tmp_path / 'e.trk.tmp').write_bytes(b'x' * 1000)
+    
+    tracking.prune_track_cache(max_bytes=250)
+    assert sorted(os.listdir(tmp_path)) == ['c.trk', 'd.trk', 'e.trk.tmp']
+    
+    tracking.prune_track_cache(max_bytes=250)
+    assert sorted(os.listdir(tmp_path)) == ['c.trk', 'd.trk', 'e.trk.tmp']
@@ -0,0 +1,73 @@
+"""
+Tests for the app.video_io decoded-frame cache
+"""
+
+import cv2
+import numpy as np
+import pytest
+
+from app import video_io
+
+@pytest.fixture
+def video_path(tmp_path):
+    """Write a short 64x48 MJPG clip"""
+    path = str(tmp_path / 'clip.avi')
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'MJPG'), 25, (64, 48))
+    if not writer.isOpened():
+        pytest.skip("OpenCV cannot write MJPG videos here")
+    for i in range(10):
+        frame = np.zeros((48, 64, 3), dtype=np.uint8)
+        cv2.rectangle(frame, (i * 4, 10), (i * 4 + 10, 30), (255, 255, 255), -1)
+        writer.write(frame)
+    writer.release()
+    return path
+
+@pytest.fixture(autouse=True)
+def empty_cache():
+    video_io.clear_gray_frame_cache()
+    yield
+    video_io.clear_gray_frame_cache()
+    video_io.set_gray_frame_cache_budget(video_io.GRAY_FRAME_CACHE_BYTES)
+
+def fail_to_open(video_path):
+    raise AssertionError("video was decoded again")
+
+def test_second_pass_is_served_from_memory(video_path, monkeypatch):
+    total_frames, frames = video_io.open_gray_frames(video_path)
+    first_pass = list(frames)
+    assert len(first_pass) == 10
+    
+    monkeypatch.setattr(video_io, 'open_video_capture', fail_to_open)
+    total_frames, frames = video_io.open_gray_frames(video_path)
+    assert total_frames == 10
+    for cached, decoded in zip(frames, first_pass):
+        np.testing.assert_array_equal(cached, decoded)
+    
+    # Frame steps are served from the same frames
+    _, frames = video_io.open_gray_frames(video_path, step=3)
+    assert len(list(frames)) == 4
+
+def test_videos_over_budget_and_partial_reads_are_not_cached(video_path, monkeypatch):
+    # A partially consumed pass is not cached
+    _, frames = video_io.open_gray_frames(video_path)
+    next(frames)
+    frames.close()
+    
+    # Nor is a video larger than the budget
+    video_io.set_gray_frame_cache_budget(5 * 64 * 48)
+    _, frames = video_io.open_gray_frames(video_path)
+    assert len(list(frames)) == 10
+    
+    monkeypatch.setattr(video_io, 'open_video_capture', fail_to_open)
+    with pytest.raises(AssertionError):
+        video_io.open_gray_frames(video_path)
+
+def test_clear_and_smaller_budget_drop_cached_frames(video_path, monkeypatch):
+    list(video_io.open_gray_frames(video_path)[1])
+    video_io.clear_gray_frame_cache()
+    assert len(list(video_io.open_gray_frames(video_path)[1])) == 10
+    video_io.set_gray_frame_cache_budget(5 * 64 * 48)
+    
+    monkeypatch.setattr(video_io, 'open_video_capture', fail_to_open)
+    with pytest.raises(AssertionError):
+        video_io.open_gray_frames(video_path)